@@ -0,0 +1,179 @@
+"""
+Batch shortest-path queries for degrees.py.
+
+Queries are read as JSON lines of the form
+    {"source": "102", "target": "129"}
+with person ids, or with "source_name" and "target_name" to name people
+instead. A name must match exactly one person; otherwise the result
+lists ranked candidates under "source_candidates" or
+"target_candidates". Queries are answered across a pool of worker
+processes. Each
+worker uses the module-level graph loaded by degrees.load_data: forked
+workers inherit the parent's copy, and spawned workers map the same
+binary snapshot, so the graph is shared read-only rather than rebuilt.
+
+Blank lines are skipped. Results are written as JSON lines in completion
+order, each carrying the zero-based input `line` of its query and the
+number of people the search `expanded`:
+    {"line": 0, "source": "102", "target": "129", "expanded": 1,
+     "degrees": 1, "path": [["104257", "129"]]}
+Queries that cannot be answered get an "error" message instead.
+"""
+
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+import degrees
+
+# Queries handed to a worker at a time
+CHUNKSIZE = 16
+
+# Candidates listed for a name that does not match exactly one person
+CANDIDATES = 5
+
+# Search method used by this worker process, set by init_worker
+method = "bfs"
+
+
+def run(directory, queries, output, method="bfs", workers=None, cache=True,
+        landmarks=None):
+    """
+    Answers every JSONL query line in `queries`, writing one result
+    line to `output` as each completes. `landmarks` is the landmark
+    count for the "alt" method. Returns (count, seconds, expanded),
+    where expanded is the total number of people the searches expanded.
+    """
+    workers = workers or os.cpu_count() or 1
+    landmarks = landmarks or degrees.landmarks.COUNT
+    start = time.perf_counter()
+
+    tasks = (
+        (line, text) for line, text in enumerate(queries) if text.strip()
+    )
+    if workers == 1:
+        init_worker(directory, method, cache, landmarks)
+        results = map(answer, tasks)
+        count, expanded = write_results(results, output)
+    else:
+        # Load (and store) the graph and landmarks before workers start
+        init_worker(directory, method, cache, landmarks)
+        with multiprocessing.Pool(
+            workers, initializer=init_worker,
+            initargs=(directory, method, cache, landmarks)
+        ) as pool:
+            results = pool.imap_unordered(answer, tasks, CHUNKSIZE)
+            count, expanded = write_results(results, output)
+
+    return count, time.perf_counter() - start, expanded
+
+
+def init_worker(directory, search_method, cache, landmarks):
+    """Prepares a worker process to answer queries."""
+    global method
+    method = search_method
+    if degrees.graph is None:
+        degrees.load_data(directory, cache=cache)
+    if method == "alt" and degrees.landmark_table is None:
+        degrees.prepare_landmarks(landmarks)
+
+
+def answer(task):
+    """Returns the result for one (line number, JSON text) query."""
+    line, text = task
+    result = {"line": line}
+    try:
+        query = json.loads(text)
+        source = resolve(query, "source", result)
+        target = resolve(query, "target", result)
+    except (ValueError, KeyError, TypeError):
+        result["error"] = "expected an object with source and target"
+        return result
+    if source is None or target is None:
+        result["error"] = "name does not match exactly one person"
+        return result
+
+    stats = {}
+    try:
+        path = degrees.shortest_path(source, target, method, stats)
+    except KeyError as e:
+        result["error"] = f"unknown person id: {e.args[0]}"
+        return result
+    result["expanded"] = stats["expanded"]
+
+    if path is None:
+        result["degrees"] = None
+        result["path"] = None
+    else:
+        result["degrees"] = len(path)
+        result["path"] = [list(step) for step in path]
+    return result
+
+
+def resolve(query, role, result):
+    """
+    Returns the person id given for `role` ("source" or "target") in a
+    query, recording it in result. Names are resolved through the name
+    index; if a name does not match exactly one person, records the
+    best candidates instead and returns None.
+    """
+    if role in query:
+        result[role] = person_id = str(query[role])
+        return person_id
+
+    name = str(query[f"{role}_name"])
+    result[f"{role}_name"] = name
+    candidates = degrees.candidates_for_name(name, CANDIDATES)
+    exact = [
+        candidate for candidate in candidates if candidate["match"] == "exact"
+    ]
+    if len(exact) == 1:
+        result[role] = exact[0]["id"]
+        return exact[0]["id"]
+    result[f"{role}_candidates"] = candidates
+    return None
+
+
+def write_results(results, output):
+    """
+    Writes results as JSON lines. Returns how many were written and
+    the total people expanded to answer them.
+    """
+    count = 0
+    expanded = 0
+    for result in results:
+        output.write(json.dumps(result) + "\n")
+        output.flush()
+        count += 1
+        expanded += result.get("expanded", 0)
+    return count, expanded
+
+
+def main(args):
+    """Runs a batch from the parsed degrees.py command-line arguments."""
+    if args.batch == "-":
+        count, seconds, expanded = run(
+            args.directory, sys.stdin, sys.stdout,
+            args.method, args.workers, args.cache, args.landmarks
+        )
+    else:
+        with open(args.batch, encoding="utf-8") as f:
+            count, seconds, expanded = run(
+                args.directory, f, sys.stdout,
+                args.method, args.workers, args.cache, args.landmarks
+            )
+
+    rate = count / seconds if seconds else 0
+    print(
+        f"Answered {count} queries in {seconds:.2f}s "
+        f"({rate:.1f} queries/sec, {args.workers or os.cpu_count()} workers).",
+        file=sys.stderr
+    )
+    if count:
+        print(
+            f"Expanded {expanded} people ({expanded / count:.1f} per query) "
+            f"with method {args.method}.",
+            file=sys.stderr
+        )
@@ -0,0 +1,115 @@
+"""
+Micro-benchmark comparing the original list-backed frontiers with the
+deque-backed frontiers in util.py, running the same breadth-first
+search loop as degrees.shortest_path over a synthetic graph.
+
+Usage: python benchmark.py [nodes] [legacy_limit]
+"""
+
+import random
+import sys
+import time
+
+from util import Node, QueueFrontier
+
+NODES = 1_000_000
+DEGREE = 4
+
+# The list-backed frontier is quadratic, so larger graphs are skipped
+LEGACY_LIMIT = 10_000
+
+
+class LegacyStackFrontier():
+    """The original list-backed frontier, kept here for comparison."""
+
+    def __init__(self):
+        self.frontier = []
+
+    def add(self, node):
+        self.frontier.append(node)
+
+    def contains_state(self, state):
+        return any(node.state == state for node in self.frontier)
+
+    def empty(self):
+        return len(self.frontier) == 0
+
+    def remove(self):
+        if self.empty():
+            raise Exception("empty frontier")
+        else:
+            node = self.frontier[-1]
+            self.frontier = self.frontier[:-1]
+            return node
+
+
+class LegacyQueueFrontier(LegacyStackFrontier):
+
+    def remove(self):
+        if self.empty():
+            raise Exception("empty frontier")
+        else:
+            node = self.frontier[0]
+            self.frontier = self.frontier[1:]
+            return node
+
+
+def main():
+    if len(sys.argv) > 3:
+        sys.exit("Usage: python benchmark.py [nodes] [legacy_limit]")
+    nodes = int(sys.argv[1]) if len(sys.argv) > 1 else NODES
+    legacy_limit = int(sys.argv[2]) if len(sys.argv) > 2 else LEGACY_LIMIT
+
+    sizes = sorted({size for size in (1_000, 10_000, 100_000) if size < nodes})
+    sizes.append(nodes)
+
+    print(f"{'nodes':>10}  {'legacy (s)':>12}  {'deque (s)':>12}")
+    for size in sizes:
+        graph = synthetic_graph(size, DEGREE)
+        new = timed_search(graph, QueueFrontier)
+        if size <= legacy_limit:
+            old = f"{timed_search(graph, LegacyQueueFrontier):12.3f}"
+        else:
+            old = f"{'skipped':>12}"
+        print(f"{size:>10}  {old}  {new:12.3f}")
+
+
+def synthetic_graph(size, degree, seed=0):
+    """
+    Returns adjacency lists for a random graph on `size` nodes, where
+    each node links to `degree` others and to its successor, so every
+    node is reachable from node 0.
+    """
+    rng = random.Random(seed)
+    graph = []
+    for i in range(size):
+        neighbors = [rng.randrange(size) for _ in range(degree)]
+        neighbors.append((i + 1) % size)
+        graph.append(neighbors)
+    return graph
+
+
+def timed_search(graph, frontier_class):
+    """
+    Returns the seconds taken to explore the whole graph from node 0
+    with the search loop used by degrees.shortest_path.
+    """
+    start = time.perf_counter()
+
+    frontier = frontier_class()
+    frontier.add(Node(state=0, parent=None, action=None))
+    explored = set()
+    while not frontier.empty():
+        node = frontier.remove()
+        explored.add(node.state)
+        for state in graph[node.state]:
+            if not frontier.contains_state(state) and state not in explored:
+                frontier.add(Node(state=state, parent=node, action=None))
+
+    if len(explored) != len(graph):
+        raise Exception("search did not reach every node")
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    main()
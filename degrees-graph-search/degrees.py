@@ -1,67 +1,123 @@
-import csv
+import argparse
+import functools
+import heapq
+import random
 import sys
 
+import ingest
+import landmarks
+import snapshot
+from graph import SearchTree
+from nameindex import NameIndex
 from util import Node, QueueFrontier
 
-# Maps names to a set of corresponding person_ids
-names = {}
+# Compiled co-star graph of people and movies, see graph.py
+graph = None
 
-# Maps person_ids to a dictionary of: name, birth, movies (a set of movie_ids)
-people = {}
+# Landmark distances used by the "alt" search, see landmarks.py
+landmark_table = None
 
-# Maps movie_ids to a dictionary of: title, year, stars (a set of person_ids)
-movies = {}
+# Directory and cache setting of the loaded data, for landmark tables
+data_location = (None, True)
 
+# Search strategies understood by shortest_path
+METHODS = ("bfs", "bidirectional", "tree", "alt")
 
-def load_data(directory):
+# Most recently used single-source search trees kept by search_tree
+TREE_CACHE_SIZE = 8
+
+
+def load_data(directory, cache=True):
     """
     Load data from CSV files into memory.
+
+    With `cache`, a binary snapshot of the compiled graph is kept next
+    to the CSV files and used instead of them while they are unchanged.
+
+    Returns the ingestion statistics from ingest.ingest when the CSV
+    files were parsed, or None when the snapshot was used.
     """
-    # Load people
-    with open(f"{directory}/people.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            people[row["id"]] = {
-                "name": row["name"],
-                "birth": row["birth"],
-                "movies": set(),
-            }
-            if row["name"].lower() not in names:
-                names[row["name"].lower()] = {row["id"]}
-            else:
-                names[row["name"].lower()].add(row["id"])
-
-    # Load movies
-    with open(f"{directory}/movies.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            movies[row["id"]] = {
-                "title": row["title"],
-                "year": row["year"],
-                "stars": set(),
-            }
-
-    # Load stars
-    with open(f"{directory}/stars.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            try:
-                people[row["person_id"]]["movies"].add(row["movie_id"])
-                movies[row["movie_id"]]["stars"].add(row["person_id"])
-            except KeyError:
-                pass
+    global graph, landmark_table, data_location
+    search_tree.cache_clear()
+    landmark_table = None
+    data_location = (directory, cache)
+    if cache:
+        graph = snapshot.load(directory)
+        if graph is not None:
+            return None
+
+    graph, stats = ingest.ingest(directory)
+    if cache:
+        try:
+            snapshot.save(graph, directory)
+        except OSError:
+            # A read-only data directory just means no snapshot
+            pass
+    return stats
 
 
 def main():
-    if len(sys.argv) > 2:
-        sys.exit("Usage: python degrees.py [directory]")
-    directory = sys.argv[1] if len(sys.argv) == 2 else "large"
+    parser = argparse.ArgumentParser(
+        description="Find degrees of separation between two actors."
+    )
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument(
+        "--no-cache", dest="cache", action="store_false",
+        help="always parse the CSV files and skip the binary snapshot"
+    )
+    parser.add_argument(
+        "--method", choices=METHODS, default="bfs",
+        help="search strategy used to connect the two people"
+    )
+    parser.add_argument(
+        "--batch", metavar="FILE",
+        help="answer JSONL source/target queries from FILE ('-' for stdin)"
+    )
+    parser.add_argument(
+        "--workers", type=int,
+        help="worker processes for --batch (default: one per CPU)"
+    )
+    parser.add_argument(
+        "--histogram", action="store_true",
+        help="print how many people are each distance from one person"
+    )
+    parser.add_argument(
+        "--sample", type=int, metavar="N",
+        help="print the distance distribution over N random sources"
+    )
+    parser.add_argument(
+        "--landmarks", type=int, default=landmarks.COUNT, metavar="N",
+        help=f"landmark people for --method alt (default: {landmarks.COUNT})"
+    )
+    args = parser.parse_args()
+    directory = args.directory
+
+    if args.batch is not None:
+        import batch
+        batch.main(args)
+        return
 
     # Load data from files into memory
     print("Loading data...")
-    load_data(directory)
+    stats = load_data(directory, cache=args.cache)
+    if stats is not None:
+        ingest.print_report(stats)
     print("Data loaded.")
 
+    if args.sample is not None:
+        print_histogram(sample_distances(args.sample))
+        return
+
+    if args.method == "alt":
+        prepare_landmarks(args.landmarks)
+
+    if args.histogram:
+        source = person_id_for_name(input("Name: "))
+        if source is None:
+            sys.exit("Person not found.")
+        print_histogram(distance_histogram(source))
+        return
+
     source = person_id_for_name(input("Name: "))
     if source is None:
         sys.exit("Person not found.")
@@ -69,7 +125,7 @@ def main():
     if target is None:
         sys.exit("Person not found.")
 
-    path = shortest_path(source, target)
+    path = shortest_path(source, target, method=args.method)
 
     if path is None:
         print("Not connected.")
@@ -78,27 +134,74 @@ def main():
         print(f"{degrees} degrees of separation.")
         path = [(None, source)] + path
         for i in range(degrees):
-            person1 = people[path[i][1]]["name"]
-            person2 = people[path[i + 1][1]]["name"]
-            movie = movies[path[i + 1][0]]["title"]
+            person1 = graph.name(path[i][1])
+            person2 = graph.name(path[i + 1][1])
+            movie = graph.title(path[i + 1][0])
             print(f"{i + 1}: {person1} and {person2} starred in {movie}")
 
 
-def shortest_path(source, target):
+def shortest_path(source, target, method="bfs", stats=None):
     """
     Returns the shortest list of (movie_id, person_id) pairs
     that connect the source to the target.
 
+    `method` selects the search strategy: "bfs" expands outward from
+    source only, "bidirectional" expands from both ends and meets in
+    the middle, "tree" reads the path from a cached search tree of
+    the whole graph from source, which pays off when many queries
+    share a source, and "alt" runs A* guided by landmark distances
+    (see landmarks.py).
+
+    If `stats` is a dictionary, stats["expanded"] is set to the number
+    of people whose co-stars the search visited.
+
     If no possible path, returns None.
     """
+    if method not in METHODS:
+        raise ValueError(f"unknown search method: {method}")
+    if stats is None:
+        stats = {}
+    stats["expanded"] = 0
+
     # If user enters in the same name actor soure and target - None, not 1.
     if source == target:
        return []
-    
-    # Use neighbors_for_person function for 0 degree seperation
-    for movie_id, person_id in neighbors_for_person(source):
-        if person_id == target:
-            return [(movie_id, target)]
+
+    # Search over graph indices, translating the path back to ids at the end
+    source = graph.person_index(source)
+    target = graph.person_index(target)
+    if method == "bidirectional":
+        path = bidirectional_path(source, target, stats)
+    elif method == "tree":
+        misses = search_tree.cache_info().misses
+        tree = search_tree(source)
+        if search_tree.cache_info().misses > misses:
+            stats["expanded"] = tree.expanded
+        path = tree.path(target)
+    elif method == "alt":
+        path = landmark_path(source, target, stats)
+    else:
+        path = breadth_first_path(source, target, stats)
+    if path is None:
+        return None
+    return [
+        (graph.movie_ids[movie], graph.person_ids[person])
+        for movie, person in path
+    ]
+
+
+def breadth_first_path(source, target, stats):
+    """
+    Returns the shortest list of (movie, person) index pairs that
+    connect the source index to the target index, searching outward
+    from source only.
+
+    If no possible path, returns None.
+    """
+    # Use the neighbors of source for 1 degree of seperation
+    for movie, person in graph.neighbors(source):
+        if person == target:
+            return [(movie, target)]
 
     # Initialize frontier to just the starting position with source as the starting state
     start = Node(state=source, parent=None, action=None)
@@ -130,28 +233,230 @@ def shortest_path(source, target):
 
         # Mark node as explored
         explored.add(node.state)
+        stats["expanded"] += 1
 
         # Add neighbors to frontier
-        for action, state in neighbors_for_person(node.state):
+        for action, state in graph.neighbors(node.state):
             if not frontier.contains_state(state) and state not in explored:
                 child = Node(state=state, parent=node, action=action)
                 frontier.add(child)
 
 
+def bidirectional_path(source, target, stats):
+    """
+    Returns the shortest list of (movie, person) index pairs that
+    connect the source to the target by running breadth-first search
+    from both ends at once, always growing the smaller frontier by one
+    full layer. The first person reached by both searches joins them.
+
+    If no possible path, returns None.
+    """
+    # Each side maps a reached person to the (movie, person) step that
+    # reached it, or None for the side's starting person
+    forward = {source: None}
+    backward = {target: None}
+    forward_layer = [source]
+    backward_layer = [target]
+
+    while forward_layer and backward_layer:
+        if len(forward_layer) <= len(backward_layer):
+            meeting, forward_layer = expand_layer(
+                forward_layer, forward, backward, stats
+            )
+        else:
+            meeting, backward_layer = expand_layer(
+                backward_layer, backward, forward, stats
+            )
+        if meeting is not None:
+            return splice_path(meeting, forward, backward)
+
+    # One side ran out of people to reach, so no connection
+    return None
+
+
+def expand_layer(layer, reached, opposite, stats):
+    """
+    Expands every person in `layer` by one step, recording new people
+    in `reached`. Returns (meeting, next_layer) where meeting is the
+    first newly reached person already reached by `opposite`, or None.
+    """
+    next_layer = []
+    for person in layer:
+        stats["expanded"] += 1
+        for movie, neighbor in graph.neighbors(person):
+            if neighbor in reached:
+                continue
+            reached[neighbor] = (movie, person)
+            if neighbor in opposite:
+                return neighbor, next_layer
+            next_layer.append(neighbor)
+    return None, next_layer
+
+
+def splice_path(meeting, forward, backward):
+    """
+    Joins the forward and backward search trees at `meeting` into a
+    single list of (movie, person) pairs from source to target.
+    """
+    # Walk back from the meeting person to the source
+    path = []
+    person = meeting
+    while forward[person] is not None:
+        movie, parent = forward[person]
+        path.append((movie, person))
+        person = parent
+    path.reverse()
+
+    # Walk on from the meeting person to the target
+    person = meeting
+    while backward[person] is not None:
+        movie, child = backward[person]
+        path.append((movie, child))
+        person = child
+    return path
+
+
+def landmark_path(source, target, stats):
+    """
+    Returns the shortest list of (movie, person) index pairs that
+    connect the source to the target using A* search, ordering the
+    frontier by degrees so far plus the landmark lower bound on the
+    degrees still to go. Ties go to the person closest to target.
+
+    If no possible path, returns None.
+    """
+    if landmark_table is None:
+        prepare_landmarks()
+    bound = landmark_table.bound(target)
+    estimate = bound(source)
+    if estimate is None:
+        return None
+
+    # Maps each reached person to their depth and the step reaching them
+    depths = {source: 0}
+    steps = {source: None}
+    frontier = [(estimate, 0, source)]
+    explored = set()
+
+    while frontier:
+        person = heapq.heappop(frontier)[2]
+        if person in explored:
+            continue
+        depth = depths[person]
+
+        if person == target:
+            path = []
+            while steps[person] is not None:
+                movie, parent = steps[person]
+                path.append((movie, person))
+                person = parent
+            path.reverse()
+            return path
+
+        explored.add(person)
+        stats["expanded"] += 1
+        for movie, neighbor in graph.neighbors(person):
+            if depth + 1 >= depths.get(neighbor, depth + 2):
+                continue
+            estimate = bound(neighbor)
+            if estimate is None:
+                continue
+            depths[neighbor] = depth + 1
+            steps[neighbor] = (movie, person)
+            heapq.heappush(
+                frontier, (depth + 1 + estimate, -(depth + 1), neighbor)
+            )
+
+    return None
+
+
+def prepare_landmarks(count=landmarks.COUNT):
+    """
+    Loads the landmark table for the loaded data, or computes it from
+    the `count` best-connected people and stores it next to the data.
+    """
+    global landmark_table
+    directory, cache = data_location
+    if cache:
+        landmark_table = landmarks.load(graph, directory, count)
+        if landmark_table is not None:
+            return
+
+    landmark_table = landmarks.Landmarks.build(graph, count)
+    if cache:
+        try:
+            landmarks.save(landmark_table, graph, directory)
+        except OSError:
+            # A read-only data directory just means nothing is stored
+            pass
+
+
+@functools.lru_cache(maxsize=TREE_CACHE_SIZE)
+def search_tree(source):
+    """
+    Returns the SearchTree from the source person index, reusing the
+    trees of recently searched sources.
+    """
+    return SearchTree(graph, source)
+
+
+def distance_histogram(source):
+    """
+    Returns a dictionary mapping each degree of separation to the
+    number of people that far from the source person_id, with people
+    the source is not connected to counted under None.
+    """
+    counts = search_tree(graph.person_index(source)).histogram()
+    if -1 in counts:
+        counts[None] = counts.pop(-1)
+    return counts
+
+
+def sample_distances(samples, seed=None):
+    """
+    Estimates the distribution of degrees of separation over all pairs
+    of people by summing distance histograms from `samples` random
+    sources. Returns a dictionary like distance_histogram's.
+    """
+    rng = random.Random(seed)
+    counts = {}
+    for _ in range(samples):
+        source = rng.randrange(len(graph))
+
+        # Each tree is used once, so skip the cache
+        histogram = SearchTree(graph, source).histogram()
+        for distance, count in histogram.items():
+            key = None if distance == -1 else distance
+            counts[key] = counts.get(key, 0) + count
+    return counts
+
+
+def print_histogram(counts):
+    """Prints a distance histogram, unconnected people last."""
+    total = sum(counts.values())
+    for distance in sorted(d for d in counts if d is not None):
+        count = counts[distance]
+        print(f"{distance}: {count} ({count / total:.2%})")
+    if None in counts:
+        count = counts[None]
+        print(f"Not connected: {count} ({count / total:.2%})")
+
+
 def person_id_for_name(name):
     """
     Returns the IMDB id for a person's name,
     resolving ambiguities as needed.
     """
-    person_ids = list(names.get(name.lower(), set()))
+    person_ids = [
+        graph.person_ids[person] for person in name_index().exact(name)
+    ]
     if len(person_ids) == 0:
         return None
     elif len(person_ids) > 1:
         print(f"Which '{name}'?")
         for person_id in person_ids:
-            person = people[person_id]
-            name = person["name"]
-            birth = person["birth"]
+            name = graph.name(person_id)
+            birth = graph.birth(person_id)
             print(f"ID: {person_id}, Name: {name}, Birth: {birth}")
         try:
             person_id = input("Intended Person ID: ")
@@ -164,17 +469,42 @@ def person_id_for_name(name):
         return person_ids[0]
 
 
+def candidates_for_name(name, limit=10):
+    """
+    Returns up to `limit` people matching a name, best first, without
+    prompting. Exact matches come first, then names starting with the
+    given text, then similarly spelled names, with people of more
+    co-stars first among equally close names. Each candidate is a
+    dictionary of: id, name, birth, match ("exact", "prefix" or
+    "fuzzy") and score (trigram similarity between 0 and 1).
+    """
+    candidates = []
+    for person, match, score in name_index().lookup(name, limit,
+                                                    graph.degree):
+        candidates.append({
+            "id": graph.person_ids[person],
+            "name": graph.person_names[person],
+            "birth": graph.person_births[person],
+            "match": match,
+            "score": round(score, 3),
+        })
+    return candidates
+
+
+def name_index():
+    """Returns the graph's NameIndex, building it on first use."""
+    if graph.name_index is None:
+        graph.name_index = NameIndex.build(graph)
+    return graph.name_index
+
+
 def neighbors_for_person(person_id):
     """
-    Returns (movie_id, person_id) pairs for people
+    Yields (movie_id, person_id) pairs for people
     who starred with a given person.
     """
-    movie_ids = people[person_id]["movies"]
-    neighbors = set()
-    for movie_id in movie_ids:
-        for person_id in movies[movie_id]["stars"]:
-            neighbors.add((movie_id, person_id))
-    return neighbors
+    for movie, person in graph.neighbors(graph.person_index(person_id)):
+        yield graph.movie_ids[movie], graph.person_ids[person]
 
 
 if __name__ == "__main__":
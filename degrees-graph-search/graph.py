@@ -0,0 +1,342 @@
+"""
+Compact co-star graph for degrees.py.
+
+People and movies are interned to dense integer indices in CSV order.
+Each person's co-stars are stored in compressed sparse row (CSR) form:
+the edges of person p are positions offsets[p] to offsets[p + 1] of the
+parallel `targets` (co-star index) and `edge_movies` (shared movie
+index) arrays. Names, titles and years live in packed string tables
+rather than one Python object per value.
+"""
+
+from array import array
+
+
+class StringTable():
+    """
+    Read-only sequence of strings packed into a single UTF-8 blob,
+    where string i is blob[offsets[i]:offsets[i + 1]].
+    """
+
+    def __init__(self, blob, offsets):
+        self.blob = blob
+        self.offsets = offsets
+
+    @classmethod
+    def from_strings(cls, strings):
+        offsets = array("q", [0])
+        chunks = []
+        end = 0
+        for string in strings:
+            chunk = string.encode("utf-8")
+            chunks.append(chunk)
+            end += len(chunk)
+            offsets.append(end)
+        return cls(b"".join(chunks), offsets)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        if not 0 <= i < len(self):
+            raise IndexError("string table index out of range")
+        return str(self.blob[self.offsets[i]:self.offsets[i + 1]], "utf-8")
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+
+class StringTableBuilder():
+    """Appends strings straight into the blob of a future StringTable."""
+
+    def __init__(self):
+        self.blob = bytearray()
+        self.offsets = array("q", [0])
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def append(self, string):
+        self.blob += string.encode("utf-8")
+        self.offsets.append(len(self.blob))
+
+    def build(self):
+        return StringTable(self.blob, self.offsets)
+
+
+class Graph():
+    """
+    Co-star graph over interned people and movies, see module docstring.
+    """
+
+    def __init__(self, person_ids, person_names, person_births,
+                 movie_ids, movie_titles, movie_years,
+                 offsets, targets, edge_movies):
+        self.person_ids = person_ids
+        self.person_names = person_names
+        self.person_births = person_births
+        self.movie_ids = movie_ids
+        self.movie_titles = movie_titles
+        self.movie_years = movie_years
+        self.offsets = offsets
+        self.targets = targets
+        self.edge_movies = edge_movies
+
+        # Maps from external ids to indices, built on first lookup
+        self.person_lookup = None
+        self.movie_lookup = None
+
+        # NameIndex over person names, see nameindex.py
+        self.name_index = None
+
+        # Memory map backing the arrays when loaded from a snapshot
+        self.mapping = None
+
+    def __len__(self):
+        return len(self.person_ids)
+
+    def person_index(self, person_id):
+        """Returns the index of a person id, raising KeyError if unknown."""
+        if self.person_lookup is None:
+            self.person_lookup = {
+                person_id: i for i, person_id in enumerate(self.person_ids)
+            }
+        return self.person_lookup[person_id]
+
+    def movie_index(self, movie_id):
+        """Returns the index of a movie id, raising KeyError if unknown."""
+        if self.movie_lookup is None:
+            self.movie_lookup = {
+                movie_id: i for i, movie_id in enumerate(self.movie_ids)
+            }
+        return self.movie_lookup[movie_id]
+
+    def name(self, person_id):
+        return self.person_names[self.person_index(person_id)]
+
+    def birth(self, person_id):
+        return self.person_births[self.person_index(person_id)]
+
+    def title(self, movie_id):
+        return self.movie_titles[self.movie_index(movie_id)]
+
+    def degree(self, person):
+        """Returns the number of co-star edges of a person index."""
+        return self.offsets[person + 1] - self.offsets[person]
+
+    def neighbors(self, person):
+        """
+        Yields (movie, person) index pairs for people who starred
+        with the person at index `person`.
+        """
+        targets = self.targets
+        edge_movies = self.edge_movies
+        for edge in range(self.offsets[person], self.offsets[person + 1]):
+            yield edge_movies[edge], targets[edge]
+
+
+class GraphBuilder():
+    """
+    Collects people, movies and star rows, then compiles them into a
+    Graph. Everything is kept in packed strings and flat arrays as it
+    arrives, so only the id lookups hold one object per row.
+
+    Repeated person or movie ids keep their first row and are counted
+    in `duplicates`. Star rows naming an unknown person or movie are
+    counted in `dangling` (and in `missing_people` / `missing_movies`
+    by cause) and otherwise ignored.
+    """
+
+    def __init__(self):
+        self.person_lookup = {}
+        self.person_ids = StringTableBuilder()
+        self.person_names = StringTableBuilder()
+        self.person_births = StringTableBuilder()
+        self.movie_lookup = {}
+        self.movie_ids = StringTableBuilder()
+        self.movie_titles = StringTableBuilder()
+        self.movie_years = StringTableBuilder()
+        self.star_people = array("i")
+        self.star_movies = array("i")
+        self.duplicates = 0
+        self.dangling = 0
+        self.missing_people = 0
+        self.missing_movies = 0
+
+    def add_person(self, person_id, name, birth):
+        if person_id in self.person_lookup:
+            self.duplicates += 1
+            return
+        self.person_lookup[person_id] = len(self.person_lookup)
+        self.person_ids.append(person_id)
+        self.person_names.append(name)
+        self.person_births.append(birth)
+
+    def add_movie(self, movie_id, title, year):
+        if movie_id in self.movie_lookup:
+            self.duplicates += 1
+            return
+        self.movie_lookup[movie_id] = len(self.movie_lookup)
+        self.movie_ids.append(movie_id)
+        self.movie_titles.append(title)
+        self.movie_years.append(year)
+
+    def add_star(self, person_id, movie_id):
+        """Records a star row, returning False if it is dangling."""
+        person = self.person_lookup.get(person_id)
+        movie = self.movie_lookup.get(movie_id)
+        if person is None or movie is None:
+            self.dangling += 1
+            self.missing_people += person is None
+            self.missing_movies += movie is None
+            return False
+        self.star_people.append(person)
+        self.star_movies.append(movie)
+        return True
+
+    def build(self):
+        """
+        Compiles everything added so far into a Graph. The star rows
+        are consumed, so the builder cannot be built twice.
+        """
+        cast_offsets, cast_people = self.casts()
+
+        # Count each person's co-star edges to size the CSR offsets
+        degrees = array("q", bytes(8 * len(self.person_lookup)))
+        for movie in range(len(cast_offsets) - 1):
+            start, end = cast_offsets[movie], cast_offsets[movie + 1]
+            for person in cast_people[start:end]:
+                degrees[person] += end - start - 1
+        offsets = array("q", [0])
+        total = 0
+        for degree in degrees:
+            total += degree
+            offsets.append(total)
+        del degrees
+
+        # Fill every person's slice of the edge arrays
+        targets = array("i", bytes(4 * total))
+        edge_movies = array("i", bytes(4 * total))
+        cursor = array("q", offsets[:-1])
+        for movie in range(len(cast_offsets) - 1):
+            cast = cast_people[cast_offsets[movie]:cast_offsets[movie + 1]]
+            for person in cast:
+                edge = cursor[person]
+                for costar in cast:
+                    if costar != person:
+                        targets[edge] = costar
+                        edge_movies[edge] = movie
+                        edge += 1
+                cursor[person] = edge
+
+        return Graph(
+            self.person_ids.build(),
+            self.person_names.build(),
+            self.person_births.build(),
+            self.movie_ids.build(),
+            self.movie_titles.build(),
+            self.movie_years.build(),
+            offsets, targets, edge_movies,
+        )
+
+    def casts(self):
+        """
+        Groups the star rows by movie with a counting sort, dropping
+        repeated rows. Returns CSR (offsets, people) arrays where movie
+        m's distinct stars are people[offsets[m]:offsets[m + 1]].
+        """
+        movies = len(self.movie_lookup)
+        starts = array("q", bytes(8 * (movies + 1)))
+        for movie in self.star_movies:
+            starts[movie + 1] += 1
+        for movie in range(movies):
+            starts[movie + 1] += starts[movie]
+
+        grouped = array("i", bytes(4 * len(self.star_people)))
+        cursor = array("q", starts[:-1])
+        for person, movie in zip(self.star_people, self.star_movies):
+            grouped[cursor[movie]] = person
+            cursor[movie] += 1
+        self.star_people = array("i")
+        self.star_movies = array("i")
+
+        # Compact each movie's stars in place, without repeats
+        offsets = array("q", [0])
+        end = 0
+        for movie in range(movies):
+            cast = sorted(set(grouped[starts[movie]:starts[movie + 1]]))
+            grouped[end:end + len(cast)] = array("i", cast)
+            end += len(cast)
+            offsets.append(end)
+        del grouped[end:]
+        return offsets, grouped
+
+
+class SearchTree():
+    """
+    Breadth-first search tree over a Graph from one source person.
+
+    For every person index, `distances` holds the degrees of separation
+    from the source, and `parents` and `movies` hold the person and
+    movie that first reached them; all three are -1 for people the
+    source cannot reach. `expanded` counts the people whose co-stars
+    were visited while building the tree.
+    """
+
+    def __init__(self, graph, source):
+        self.source = source
+        size = len(graph)
+        self.distances = array("i", [-1]) * size
+        self.parents = array("i", [-1]) * size
+        self.movies = array("i", [-1]) * size
+
+        offsets = graph.offsets
+        targets = graph.targets
+        edge_movies = graph.edge_movies
+        distances = self.distances
+        parents = self.parents
+        movies = self.movies
+
+        distances[source] = 0
+        layer = [source]
+        distance = 0
+        self.expanded = 0
+        while layer:
+            distance += 1
+            self.expanded += len(layer)
+            next_layer = []
+            for person in layer:
+                for edge in range(offsets[person], offsets[person + 1]):
+                    neighbor = targets[edge]
+                    if distances[neighbor] < 0:
+                        distances[neighbor] = distance
+                        parents[neighbor] = person
+                        movies[neighbor] = edge_movies[edge]
+                        next_layer.append(neighbor)
+            layer = next_layer
+
+    def path(self, target):
+        """
+        Returns the (movie, person) index pairs leading from the source
+        to target, or None if target is unreachable.
+        """
+        if self.distances[target] < 0:
+            return None
+        path = []
+        person = target
+        while person != self.source:
+            path.append((self.movies[person], person))
+            person = self.parents[person]
+        path.reverse()
+        return path
+
+    def histogram(self):
+        """
+        Returns a dictionary mapping each distance to the number of
+        people at that distance, with unreachable people under -1.
+        """
+        counts = {}
+        for distance in self.distances:
+            counts[distance] = counts.get(distance, 0) + 1
+        return counts
@@ -0,0 +1,132 @@
+"""
+Streaming CSV ingestion for degrees.py.
+
+The people, movies and stars files are read with csv.reader in chunks
+of CHUNK_SIZE rows and fed straight into a GraphBuilder, which packs
+every row into flat arrays as it arrives. No per-row dictionaries or
+per-person sets are created, so memory grows with the compact graph
+rather than with the CSV text.
+"""
+
+import csv
+import itertools
+import sys
+import time
+from operator import itemgetter
+
+from graph import GraphBuilder
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows, where peak memory is not reported
+    resource = None
+
+CHUNK_SIZE = 100_000
+
+# Each file with the columns read from it, in the order they are used
+FILES = (
+    ("people.csv", ("id", "name", "birth")),
+    ("movies.csv", ("id", "title", "year")),
+    ("stars.csv", ("person_id", "movie_id")),
+)
+
+
+def ingest(directory, chunk_size=CHUNK_SIZE):
+    """
+    Parses the CSV files in directory into a Graph.
+
+    Returns (graph, stats) where stats is a dictionary of: rows (rows
+    read per file), duplicates, dangling, missing_people and
+    missing_movies (see GraphBuilder), seconds, rows_per_second and
+    peak_memory (bytes, or None where it cannot be measured).
+    """
+    builder = GraphBuilder()
+    adders = {
+        "people.csv": builder.add_person,
+        "movies.csv": builder.add_movie,
+        "stars.csv": builder.add_star,
+    }
+    start = time.perf_counter()
+
+    rows = {}
+    for filename, columns in FILES:
+        add = adders[filename]
+        rows[filename] = 0
+        for chunk in read_chunks(f"{directory}/{filename}", columns, chunk_size):
+            for row in chunk:
+                add(*row)
+            rows[filename] += len(chunk)
+
+    graph = builder.build()
+    seconds = time.perf_counter() - start
+    total = sum(rows.values())
+    stats = {
+        "rows": rows,
+        "duplicates": builder.duplicates,
+        "dangling": builder.dangling,
+        "missing_people": builder.missing_people,
+        "missing_movies": builder.missing_movies,
+        "seconds": seconds,
+        "rows_per_second": total / seconds if seconds else 0,
+        "peak_memory": peak_memory(),
+    }
+    return graph, stats
+
+
+def read_chunks(path, columns, chunk_size):
+    """
+    Yields lists of up to chunk_size row tuples holding the named
+    columns of a CSV file, in the order given. Rows too short to hold
+    every column are skipped.
+    """
+    with open(path, encoding="utf-8", newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        try:
+            positions = [header.index(column) for column in columns]
+        except ValueError:
+            raise ValueError(f"{path} must have columns {', '.join(columns)}")
+        width = max(positions) + 1
+        pick = itemgetter(*positions)
+
+        while True:
+            rows = list(itertools.islice(reader, chunk_size))
+            if not rows:
+                return
+            try:
+                yield list(map(pick, rows))
+            except IndexError:
+                yield [pick(row) for row in rows if len(row) >= width]
+
+
+def peak_memory():
+    """Returns the peak resident memory of this process in bytes."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def print_report(stats, file=sys.stdout):
+    """Prints the statistics returned by ingest."""
+    for filename, rows in stats["rows"].items():
+        print(f"  {filename}: {rows} rows", file=file)
+    print(
+        f"  {sum(stats['rows'].values())} rows in {stats['seconds']:.2f}s "
+        f"({stats['rows_per_second']:.0f} rows/sec)",
+        file=file
+    )
+    if stats["duplicates"]:
+        print(f"  Repeated ids ignored: {stats['duplicates']}", file=file)
+    if stats["dangling"]:
+        print(
+            f"  Dangling star rows skipped: {stats['dangling']} "
+            f"({stats['missing_people']} unknown people, "
+            f"{stats['missing_movies']} unknown movies)",
+            file=file
+        )
+    if stats["peak_memory"] is not None:
+        print(f"  Peak memory: {stats['peak_memory'] / 2**20:.1f} MiB", file=file)
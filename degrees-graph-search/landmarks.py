@@ -0,0 +1,170 @@
+"""
+Landmark distance tables for the ALT search in degrees.py.
+
+ALT is A* search using Landmarks and the Triangle inequality: with the
+exact distance d(L, v) from a landmark L to every person v, the
+distance between any v and t is at least |d(L, t) - d(L, v)|. The best
+bound over several well-connected landmarks is an admissible and
+consistent A* heuristic. If a landmark reaches exactly one of v and t,
+the two are not connected at all.
+
+Tables are stored in degrees.landmarks next to the CSV files: MAGIC, a
+little-endian uint32 format version and a uint32 header length, then a
+JSON header and one int16 distance array per landmark. Like the graph
+snapshot, a table is only reused while the CSV files are unchanged.
+"""
+
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+import snapshot
+from graph import SearchTree
+
+MAGIC = b"DEGLAND\0"
+VERSION = 1
+FILENAME = "degrees.landmarks"
+
+PREAMBLE = struct.Struct("<8sII")
+
+# Landmarks used when no count is given
+COUNT = 8
+
+
+class Landmarks():
+    """
+    Distances from a few landmark people to everyone in a graph, where
+    distances[i][v] is the degrees of separation from people[i] to
+    person index v, or -1 if they are not connected.
+    """
+
+    def __init__(self, people, distances):
+        self.people = people
+        self.distances = distances
+
+    @classmethod
+    def build(cls, graph, count=COUNT, people=None):
+        """
+        Computes distances from `people` (person indices), or by default
+        from the `count` people with the most co-star edges.
+        """
+        if people is None:
+            people = sorted(
+                range(len(graph)), key=graph.degree, reverse=True
+            )[:count]
+        distances = [
+            array("h", SearchTree(graph, person).distances)
+            for person in people
+        ]
+        return cls(list(people), distances)
+
+    def bound(self, target):
+        """
+        Returns a function giving, for a person index, a lower bound on
+        their distance to target, or None if they cannot reach target.
+        """
+        pairs = [
+            (distances, distances[target]) for distances in self.distances
+        ]
+
+        def lower_bound(person):
+            best = 0
+            for distances, to_target in pairs:
+                to_person = distances[person]
+                if (to_person < 0) != (to_target < 0):
+                    return None
+                gap = abs(to_target - to_person)
+                if gap > best:
+                    best = gap
+            return best
+
+        return lower_bound
+
+
+def landmarks_path(directory):
+    return os.path.join(directory, FILENAME)
+
+
+def save(landmarks, graph, directory):
+    """Writes landmarks to directory, keyed on the CSVs found there."""
+    header = {
+        "byteorder": sys.byteorder,
+        "sources": snapshot.describe_sources(directory),
+        "size": len(graph),
+        "people": [graph.person_ids[person] for person in landmarks.people],
+    }
+    write(directory, header, [
+        memoryview(distances).cast("B") for distances in landmarks.distances
+    ])
+
+
+def write(directory, header, rows):
+    """
+    Writes a landmarks file of a header and the bytes of each row of
+    distances to directory, under a temporary name moved into place.
+    """
+    header_bytes = json.dumps(header).encode("utf-8")
+
+    path = landmarks_path(directory)
+    temporary = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temporary, "wb") as f:
+            f.write(PREAMBLE.pack(MAGIC, VERSION, len(header_bytes)))
+            f.write(header_bytes)
+            f.write(bytes(snapshot.aligned(f.tell()) - f.tell()))
+            for row in rows:
+                f.write(row)
+        os.replace(temporary, path)
+    finally:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+
+
+def load(graph, directory, count=COUNT):
+    """
+    Returns the Landmarks stored in directory, or None if there are
+    none, they are stale, or they hold a different number of landmarks.
+    """
+    try:
+        with open(landmarks_path(directory), "rb") as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+
+    try:
+        magic, version, length = PREAMBLE.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            return None
+        header = json.loads(bytes(data[PREAMBLE.size:PREAMBLE.size + length]))
+        if (header["byteorder"] != sys.byteorder
+                or header["size"] != len(graph)
+                or len(header["people"]) != count):
+            return None
+        sources = snapshot.current_sources(directory, header["sources"])
+        if sources is None:
+            return None
+        people = [graph.person_index(person) for person in header["people"]]
+
+        start = snapshot.aligned(PREAMBLE.size + length)
+        width = 2 * len(graph)
+        view = memoryview(data)
+        distances = [
+            view[start + i * width:start + (i + 1) * width].cast("h")
+            for i in range(count)
+        ]
+        if any(len(row) != len(graph) for row in distances):
+            return None
+    except (struct.error, ValueError, KeyError, TypeError):
+        return None
+
+    if sources != header["sources"]:
+        # Record the new mtimes, as snapshot.load does
+        header["sources"] = sources
+        try:
+            write(directory, header, [view[start:start + count * width]])
+        except OSError:
+            pass
+    return Landmarks(people, distances)
@@ -0,0 +1,190 @@
+"""
+Name index for resolving people in degrees.py without prompting.
+
+Names are normalized (lowercase, single spaces) and kept in sorted
+order, so exact and prefix lookups are binary searches. A trigram index
+over the same entries finds names with typos: each name is padded as
+"  name " and split into overlapping three-character trigrams, and the
+entries sharing the most trigrams with the query are ranked by Jaccard
+similarity. All parts are flat arrays and packed string tables, so the
+index can be stored in and mapped from the graph snapshot.
+"""
+
+from array import array
+from bisect import bisect_left
+from collections import Counter
+
+from graph import StringTable
+
+# Most postings scanned per fuzzy lookup, rarest trigrams first; keeps
+# lookups fast when a query is made of very common trigrams
+POSTING_BUDGET = 3000
+
+# Most fuzzy candidates whose similarity is computed exactly
+SHORTLIST = 20
+
+# Most names starting with the query that are ranked per lookup, so a
+# common prefix is not answered with just its alphabetically first names
+PREFIX_WINDOW = 200
+
+# Least similarity of a fuzzy match; below it names share little more
+# than a letter or two
+MIN_FUZZY_SCORE = 0.25
+
+# Match kinds, best first
+EXACT, PREFIX, FUZZY = "exact", "prefix", "fuzzy"
+
+
+def normalize(name):
+    return " ".join(name.lower().split())
+
+
+def trigrams(key):
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class NameIndex():
+    """
+    Sorted name entries plus a trigram index, see module docstring.
+
+    Entry i has normalized name keys[i] and is person index people[i].
+    Trigram t = grams[j] occurs in the entries postings[offsets[j]:
+    offsets[j + 1]].
+    """
+
+    def __init__(self, keys, people, grams, offsets, postings):
+        self.keys = keys
+        self.people = people
+        self.grams = grams
+        self.offsets = offsets
+        self.postings = postings
+
+        # Maps trigrams to positions in grams, built on first fuzzy lookup
+        self.gram_lookup = None
+
+    @classmethod
+    def build(cls, graph):
+        """Returns a NameIndex over every person in graph."""
+        entries = sorted(
+            (normalize(name), person)
+            for person, name in enumerate(graph.person_names)
+        )
+        keys = StringTable.from_strings(key for key, _ in entries)
+        people = array("i", (person for _, person in entries))
+
+        index = {}
+        for entry, (key, _) in enumerate(entries):
+            for gram in trigrams(key):
+                posting = index.get(gram)
+                if posting is None:
+                    index[gram] = posting = array("i")
+                posting.append(entry)
+
+        grams = sorted(index)
+        offsets = array("q", [0])
+        postings = array("i")
+        for gram in grams:
+            postings.extend(index[gram])
+            offsets.append(len(postings))
+        return cls(keys, people, StringTable.from_strings(grams),
+                   offsets, postings)
+
+    def exact(self, name):
+        """Returns the person indices whose name is exactly `name`."""
+        key = normalize(name)
+        people = []
+        entry = bisect_left(self.keys, key)
+        while entry < len(self.keys) and self.keys[entry] == key:
+            people.append(self.people[entry])
+            entry += 1
+        return people
+
+    def lookup(self, name, limit=10, weight=None):
+        """
+        Returns up to `limit` (person, kind, score) matches for name,
+        best first: exact matches, then names starting with it, or if
+        there are neither, the names sharing the most trigrams with it,
+        down to MIN_FUZZY_SCORE. Scores are the Jaccard similarity of
+        the trigram sets, 1.0 for exact matches. Matches of equal score
+        are ordered by weight(person), highest first, if given.
+        """
+        key = normalize(name)
+        if not key or limit <= 0:
+            return []
+        query = trigrams(key)
+        matches = []
+
+        def ranked(scored):
+            if weight is None:
+                return sorted(scored, key=lambda match: -match[0])
+            return sorted(scored, key=lambda match: (
+                -match[0], -weight(self.people[match[1]])
+            ))
+
+        # Exact and prefix matches are contiguous in sorted order; rank
+        # up to a window of prefix matches, not just the first few
+        prefixed = []
+        entry = bisect_left(self.keys, key)
+        end = min(len(self.keys), entry + limit + PREFIX_WINDOW)
+        while entry < end:
+            candidate = self.keys[entry]
+            if not candidate.startswith(key):
+                break
+            if candidate == key:
+                if len(matches) < limit:
+                    matches.append((self.people[entry], EXACT, 1.0))
+            else:
+                prefixed.append(
+                    (similarity(query, trigrams(candidate)), entry)
+                )
+            entry += 1
+        for score, entry in ranked(prefixed)[:limit - len(matches)]:
+            matches.append((self.people[entry], PREFIX, score))
+
+        if not matches:
+            for score, entry in ranked(self.fuzzy(query))[:limit]:
+                if score < MIN_FUZZY_SCORE:
+                    break
+                matches.append((self.people[entry], FUZZY, score))
+        return matches
+
+    def fuzzy(self, query):
+        """
+        Returns (score, entry) pairs for entries sharing trigrams with
+        the query trigram set, best first.
+        """
+        if self.gram_lookup is None:
+            self.gram_lookup = {gram: i for i, gram in enumerate(self.grams)}
+
+        # Scan the rarest trigrams first, within the posting budget
+        spans = []
+        for gram in query:
+            position = self.gram_lookup.get(gram)
+            if position is not None:
+                spans.append((
+                    self.offsets[position + 1] - self.offsets[position],
+                    self.offsets[position],
+                ))
+        spans.sort()
+
+        shared = Counter()
+        scanned = 0
+        for size, start in spans:
+            if scanned and scanned + size > POSTING_BUDGET:
+                break
+            scanned += size
+            shared.update(self.postings[start:start + size])
+
+        scored = [
+            (similarity(query, trigrams(self.keys[entry])), entry)
+            for entry, _ in shared.most_common(SHORTLIST)
+        ]
+        scored.sort(key=lambda match: -match[0])
+        return scored
+
+
+def similarity(first, second):
+    """Returns the Jaccard similarity of two trigram sets."""
+    shared = len(first & second)
+    return shared / (len(first) + len(second) - shared)
@@ -0,0 +1,233 @@
+"""
+Binary snapshots of a compiled Graph, so degrees.py can skip CSV parsing.
+
+A snapshot file starts with MAGIC, a little-endian uint32 format version
+and a uint32 header length, followed by a JSON header and the raw bytes
+of every graph and name index array, each aligned to 8 bytes. The header
+records the size, mtime and SHA-256 of the CSV files the graph was built
+from, so a snapshot is only used while those files are unchanged. Loading
+maps the file read-only and wraps each array in a memoryview, without
+copying.
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+
+from graph import Graph, StringTable
+from nameindex import NameIndex
+
+MAGIC = b"DEGSNAP\0"
+VERSION = 2
+FILENAME = "degrees.snapshot"
+SOURCES = ("people.csv", "movies.csv", "stars.csv")
+
+PREAMBLE = struct.Struct("<8sII")
+ALIGNMENT = 8
+
+# Packed string tables stored for each graph, in Graph argument order
+TABLES = (
+    "person_ids", "person_names", "person_births",
+    "movie_ids", "movie_titles", "movie_years",
+)
+
+# Plain arrays stored for each graph, with their typecodes
+ARRAYS = (("offsets", "q"), ("targets", "i"), ("edge_movies", "i"))
+
+# Name index parts, stored under a "names." prefix
+NAME_TABLES = ("keys", "grams")
+NAME_ARRAYS = (("people", "i"), ("offsets", "q"), ("postings", "i"))
+
+
+def snapshot_path(directory):
+    return os.path.join(directory, FILENAME)
+
+
+def file_digest(path):
+    """Returns the hex SHA-256 digest of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def describe_sources(directory):
+    """Returns the size, mtime and digest of each CSV in directory."""
+    sources = {}
+    for filename in SOURCES:
+        path = os.path.join(directory, filename)
+        stat = os.stat(path)
+        sources[filename] = {
+            "size": stat.st_size,
+            "mtime": stat.st_mtime_ns,
+            "sha256": file_digest(path),
+        }
+    return sources
+
+
+def current_sources(directory, recorded):
+    """
+    Checks whether the CSVs in directory are the ones a snapshot was
+    built from, given the sources recorded in its header. Size and
+    mtime are compared first; a file whose mtime changed but whose size
+    did not is accepted if its digest matches.
+
+    Returns the recorded sources with the mtimes of such files brought
+    up to date, or None if the CSVs changed.
+    """
+    current = {}
+    for filename in SOURCES:
+        entry = recorded.get(filename)
+        path = os.path.join(directory, filename)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        if entry is None or entry["size"] != stat.st_size:
+            return None
+        if entry["mtime"] != stat.st_mtime_ns:
+            if entry["sha256"] != file_digest(path):
+                return None
+            entry = dict(entry, mtime=stat.st_mtime_ns)
+        current[filename] = entry
+    return current
+
+
+def save(graph, directory):
+    """
+    Writes graph to the snapshot file in directory, keyed on the CSVs
+    found there, building the graph's name index first if needed.
+    """
+    if graph.name_index is None:
+        graph.name_index = NameIndex.build(graph)
+
+    sections = []
+    for source, prefix, tables, arrays in (
+        (graph, "", TABLES, ARRAYS),
+        (graph.name_index, "names.", NAME_TABLES, NAME_ARRAYS),
+    ):
+        for name in tables:
+            table = getattr(source, name)
+            sections.append(
+                (f"{prefix}{name}.blob", "B", memoryview(table.blob))
+            )
+            sections.append(
+                (f"{prefix}{name}.offsets", "q", memoryview(table.offsets))
+            )
+        for name, typecode in arrays:
+            sections.append(
+                (f"{prefix}{name}", typecode, memoryview(getattr(source, name)))
+            )
+
+    # Lay out every section at an aligned offset after the header
+    header = {
+        "byteorder": sys.byteorder,
+        "sources": describe_sources(directory),
+        "sections": {},
+    }
+    layout = []
+    position = 0
+    for name, typecode, data in sections:
+        position = aligned(position)
+        header["sections"][name] = [typecode, position, len(data)]
+        layout.append((position, data))
+        position += data.nbytes
+    write(directory, header, layout)
+
+
+def write(directory, header, layout):
+    """
+    Writes a snapshot file of a header and (offset, data) sections to
+    directory. The file is written under a temporary name and moved
+    into place, so readers never see a partial snapshot.
+    """
+    header_bytes = json.dumps(header).encode("utf-8")
+    start = aligned(PREAMBLE.size + len(header_bytes))
+
+    path = snapshot_path(directory)
+    temporary = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temporary, "wb") as f:
+            f.write(PREAMBLE.pack(MAGIC, VERSION, len(header_bytes)))
+            f.write(header_bytes)
+            for offset, data in layout:
+                f.write(bytes(start + offset - f.tell()))
+                f.write(data.cast("B"))
+        os.replace(temporary, path)
+    finally:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+
+
+def load(directory):
+    """
+    Returns the Graph stored in directory's snapshot, or None if there
+    is no snapshot or it is unreadable or truncated, from another format
+    version or machine byte order, or stale with respect to the CSV
+    files.
+    """
+    try:
+        with open(snapshot_path(directory), "rb") as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+
+    try:
+        magic, version, length = PREAMBLE.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            return None
+        header = json.loads(bytes(data[PREAMBLE.size:PREAMBLE.size + length]))
+        if header["byteorder"] != sys.byteorder:
+            return None
+        sources = current_sources(directory, header["sources"])
+        if sources is None:
+            return None
+        start = aligned(PREAMBLE.size + length)
+        view = memoryview(data)
+        sections = {}
+        for name, (typecode, offset, count) in header["sections"].items():
+            size = struct.calcsize(typecode)
+            begin = start + offset
+            section = view[begin:begin + count * size].cast(typecode)
+            if len(section) != count:
+                # Truncated file
+                return None
+            sections[name] = section
+    except (struct.error, ValueError, KeyError, TypeError):
+        return None
+
+    if sources != header["sources"]:
+        # Record the new mtimes so the CSVs are not hashed again next
+        # time; the sections are copied as they are
+        header["sources"] = sources
+        try:
+            write(directory, header, [(0, view[start:])])
+        except OSError:
+            pass
+
+    def parts(prefix, tables, arrays):
+        return [
+            StringTable(
+                sections[f"{prefix}{name}.blob"],
+                sections[f"{prefix}{name}.offsets"]
+            )
+            for name in tables
+        ] + [sections[f"{prefix}{name}"] for name, _ in arrays]
+
+    graph = Graph(*parts("", TABLES, ARRAYS))
+    keys, grams, people, offsets, postings = parts(
+        "names.", NAME_TABLES, NAME_ARRAYS
+    )
+    graph.name_index = NameIndex(keys, people, grams, offsets, postings)
+
+    # Keep the mapping open for as long as the graph uses it
+    graph.mapping = data
+    return graph
+
+
+def aligned(position):
+    return -(-position // ALIGNMENT) * ALIGNMENT
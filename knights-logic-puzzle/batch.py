@@ -0,0 +1,265 @@
+"""
+Batch solver for knights and knaves puzzles, such as those in puzzle.py.
+
+Puzzles are read from a JSON Lines file, one puzzle per line, giving
+what each character says:
+    {"name": "Puzzle 1", "characters": ["A", "B"],
+     "statements": [{"speaker": "A", "says": ["and", ["knave", "A"],
+                                                     ["knave", "B"]]}]}
+A statement is ["knight", name] or ["knave", name], ["not", statement],
+["and", statement, ...], ["or", statement, ...], ["implies", statement,
+statement], ["iff", statement, statement], or ["says", name, statement]
+for a statement reported by someone else. "characters" is optional and
+defaults to everyone named, in order of appearance.
+
+Each puzzle is compiled into logic.py sentences (every character is
+exactly one of a knight or a knave, and what a knight says is true and
+what a knave says is false) and solved with a KnowledgeBase, across a
+pool of worker processes. One JSON object is written per puzzle, in
+input order:
+    {"name": "Puzzle 1", "consistent": true,
+     "roles": {"A": "Knave", "B": "Knight"}, "seconds": 0.0002}
+where a role is null if the puzzle does not determine it, roles is null
+for a puzzle that has no solution, and a puzzle that cannot be read has
+an "error" instead. A summary is printed to stderr.
+
+Usage: python batch.py puzzles.jsonl [--workers N] [--output FILE]
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+from logic import And, Biconditional, Implication, KnowledgeBase, Not, Or
+from logic import Symbol, clear_interned
+
+# Puzzles handed to a worker process at a time
+CHUNKSIZE = 64
+
+CONNECTIVES = {
+    "not": (Not, 1),
+    "and": (And, None),
+    "or": (Or, None),
+    "implies": (Implication, 2),
+    "iff": (Biconditional, 2),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Solve knights and knaves puzzles in bulk."
+    )
+    parser.add_argument("puzzles", help="JSON Lines file of puzzles")
+    parser.add_argument(
+        "--workers", type=int,
+        help="worker processes (default: one per CPU)"
+    )
+    parser.add_argument(
+        "--output", metavar="FILE",
+        help="write results to FILE instead of printing them"
+    )
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    with open(args.puzzles) as f:
+        lines = [line for line in f if line.strip()]
+    output = open(args.output, "w") if args.output else sys.stdout
+    counts = {"consistent": 0, "inconsistent": 0, "errors": 0}
+    try:
+        for result in solve_lines(lines, args.workers):
+            if "error" in result:
+                counts["errors"] += 1
+            elif result["consistent"]:
+                counts["consistent"] += 1
+            else:
+                counts["inconsistent"] += 1
+            output.write(json.dumps(result) + "\n")
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+    seconds = time.perf_counter() - start
+    print(
+        f"Solved {len(lines)} puzzles ({counts['consistent']} consistent, "
+        f"{counts['inconsistent']} inconsistent, {counts['errors']} errors) "
+        f"in {seconds:.2f}s, {len(lines) / seconds:.0f} puzzles/s",
+        file=sys.stderr
+    )
+
+
+def solve_lines(lines, workers=None):
+    """
+    Yields the result of solving the puzzle on each line, in order,
+    across `workers` processes (default one per CPU).
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(lines) <= CHUNKSIZE:
+        yield from map(solve_line, lines)
+        return
+    with multiprocessing.Pool(workers) as pool:
+        yield from pool.imap(solve_line, lines, CHUNKSIZE)
+
+
+def solve_line(line):
+    """Returns the result of solving the puzzle on a JSON line."""
+    try:
+        puzzle = json.loads(line)
+    except ValueError as e:
+        return {"name": None, "error": f"invalid JSON: {e}"}
+    try:
+        return solve_puzzle(puzzle)
+    except ValueError as e:
+        name = puzzle.get("name") if isinstance(puzzle, dict) else None
+        return {"name": name, "error": str(e)}
+    finally:
+        # Sentences are not shared between puzzles
+        clear_interned()
+
+
+def solve_puzzle(puzzle):
+    """
+    Returns the result of solving a puzzle: its name, whether it is
+    consistent, the role of each character, and the seconds taken.
+
+    Raises ValueError if the puzzle is malformed.
+    """
+    start = time.perf_counter()
+    characters, knowledge = compile_puzzle(puzzle)
+    knowledge = KnowledgeBase(knowledge)
+
+    roles = None
+    if knowledge.consistent():
+        knights = knowledge.determined(
+            [role_symbol(character, "Knight").name for character in characters]
+        )
+        roles = {}
+        for character in characters:
+            knight = knights.get(role_symbol(character, "Knight").name)
+            roles[character] = None if knight is None else (
+                "Knight" if knight else "Knave"
+            )
+    return {
+        "name": puzzle.get("name"),
+        "consistent": roles is not None,
+        "roles": roles,
+        "seconds": time.perf_counter() - start,
+    }
+
+
+def compile_puzzle(puzzle):
+    """
+    Returns (characters, knowledge) for a puzzle: the list of character
+    names and a sentence of everything the puzzle says.
+
+    Raises ValueError if the puzzle is malformed.
+    """
+    if not isinstance(puzzle, dict):
+        raise ValueError("puzzle must be an object")
+    statements = puzzle.get("statements", [])
+    if not isinstance(statements, list) or not all(
+        isinstance(statement, dict) and "speaker" in statement
+        and "says" in statement for statement in statements
+    ):
+        raise ValueError("statements must be a list of speaker and says")
+
+    characters = puzzle.get("characters")
+    if characters is None:
+        characters = []
+        for statement in statements:
+            named(statement["speaker"], characters)
+            mentions(statement["says"], characters)
+    elif not isinstance(characters, list) or not all(
+        isinstance(character, str) for character in characters
+    ):
+        raise ValueError("characters must be a list of names")
+
+    knowledge = []
+    for character in characters:
+        knight = role_symbol(character, "Knight")
+        knave = role_symbol(character, "Knave")
+        knowledge.append(Or(knight, knave))
+        knowledge.append(Not(And(knight, knave)))
+    for statement in statements:
+        knowledge.extend(said(
+            statement["speaker"],
+            sentence(statement["says"], characters),
+            characters
+        ))
+    return characters, And(*knowledge)
+
+
+def sentence(statement, characters):
+    """Returns the logical sentence of a statement about characters."""
+    if not isinstance(statement, list) or not statement or not isinstance(
+        statement[0], str
+    ):
+        raise ValueError(f"not a statement: {statement!r}")
+    kind, *arguments = statement
+    if kind in ("knight", "knave") and len(arguments) == 1:
+        return role_symbol(character_name(arguments[0], characters),
+                           kind.capitalize())
+    if kind == "says" and len(arguments) == 2:
+        return And(*said(arguments[0], sentence(arguments[1], characters),
+                         characters))
+    if kind in CONNECTIVES:
+        connective, count = CONNECTIVES[kind]
+        if count is None or len(arguments) == count:
+            return connective(*[
+                sentence(argument, characters) for argument in arguments
+            ])
+    raise ValueError(f"not a statement: {statement!r}")
+
+
+def said(speaker, statement, characters):
+    """
+    Returns the sentences meaning that speaker said statement: it is
+    true if they are a knight, and false if they are a knave.
+    """
+    speaker = character_name(speaker, characters)
+    return [
+        Implication(role_symbol(speaker, "Knight"), statement),
+        Implication(role_symbol(speaker, "Knave"), Not(statement)),
+    ]
+
+
+def role_symbol(character, role):
+    """Returns the symbol for character having role, as in puzzle.py."""
+    return Symbol(f"{character} is a {role}")
+
+
+def character_name(name, characters):
+    if name not in characters:
+        raise ValueError(f"unknown character {name!r}")
+    return name
+
+
+def named(name, characters):
+    """Adds name to the list of characters if it is a new name."""
+    if not isinstance(name, str):
+        raise ValueError(f"character name must be a string: {name!r}")
+    if name not in characters:
+        characters.append(name)
+
+
+def mentions(statement, characters):
+    """Adds every character named in a statement to characters."""
+    if not isinstance(statement, list) or not statement:
+        return
+    kind, *arguments = statement
+    if not isinstance(kind, str):
+        return
+    if kind in ("knight", "knave") and arguments:
+        named(arguments[0], characters)
+    elif kind == "says" and len(arguments) == 2:
+        named(arguments[0], characters)
+        mentions(arguments[1], characters)
+    else:
+        for argument in arguments:
+            mentions(argument, characters)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+"""
+Exact model counter (#SAT) for logic.py, over clauses in the format of
+sat.py.
+
+Counting follows the DPLL scheme of component-caching counters such as
+Cachet: simplify the clauses by unit propagation, split them into
+components that share no variable, count each component separately and
+multiply, and branch on a variable of a component to count it. Each
+component is cached by its clauses, so one met again under another
+branch, or in a later count with the same Counter, is only counted
+once. On structured knowledge this visits far fewer nodes than the
+2 ** n models that enumeration takes.
+
+Along with the number of models, each component also counts the models
+in which each of its variables is true, which gives the marginal of
+every variable from the same search.
+"""
+
+
+class Counter():
+
+    def __init__(self):
+        # (models, trues) of each component, by its canonical clauses
+        self.cache = {}
+
+    def count(self, clauses, variables):
+        """
+        Returns the number of assignments to variables that satisfy
+        clauses, where variables is a set of variables that includes
+        every variable in clauses.
+        """
+        return self.marginals(clauses, variables)[0]
+
+    def marginals(self, clauses, variables):
+        """
+        Returns (models, trues) for the assignments to variables that
+        satisfy clauses: how many there are, and a dict from each
+        variable to how many of them set it true.
+        """
+        simplified = propagate(clauses, ())
+        if simplified is None:
+            return 0, dict.fromkeys(variables, 0)
+        clauses, assignment = simplified
+        groups = components(clauses)
+        self.fill(groups)
+        return self.product(groups, variables, assignment)
+
+    def product(self, groups, variables, assignment):
+        """
+        Returns (models, trues) over variables for the cached components
+        in groups left after setting the literals in assignment, by
+        multiplying their counts. Variables in neither are free.
+        """
+        parts = [self.cache[group] for group in groups]
+        models = 1
+        for count, _ in parts:
+            models *= count
+        free = len(variables) - len(assignment)
+        for count, trues in parts:
+            free -= len(trues)
+        models <<= free
+
+        trues = {}
+        for count, part in parts:
+            if count:
+                for variable, true in part.items():
+                    trues[variable] = models // count * true
+        for literal in assignment:
+            trues[abs(literal)] = models if literal > 0 else 0
+        half = models >> 1
+        for variable in variables:
+            if variable not in trues:
+                trues[variable] = half
+        return models, trues
+
+    def fill(self, groups):
+        """
+        Caches (models, trues) of each component in groups, where a
+        component is a sorted tuple of sorted clause tuples.
+
+        A component is counted from the components of its two branches,
+        so those are counted first, on an explicit stack rather than by
+        recursion: the stack grows by a component per branch level,
+        which on long chains of clauses is more than Python's recursion
+        limit.
+        """
+        # (groups, assignment) of each branch of the components started
+        branches = {}
+        stack = list(groups)
+        while stack:
+            clauses = stack[-1]
+            if clauses in self.cache:
+                stack.pop()
+                continue
+            if clauses not in branches:
+                branches[clauses] = split(clauses)
+            missing = [
+                group for groups, _ in branches[clauses] for group in groups
+                if group not in self.cache
+            ]
+            if missing:
+                stack.extend(missing)
+                continue
+            stack.pop()
+
+            variables = occurring(clauses)
+            models = 0
+            trues = dict.fromkeys(variables, 0)
+            for groups, assignment in branches.pop(clauses):
+                count, part = self.product(groups, variables, assignment)
+                models += count
+                for other, true in part.items():
+                    trues[other] += true
+            self.cache[clauses] = models, trues
+
+
+def split(clauses):
+    """
+    Branches on a variable of clauses. Returns (groups, assignment) for
+    each value of it that does not conflict: the components of the
+    clauses left and the literals set true.
+    """
+    variable = branch(clauses)
+    branches = []
+    for literal in (variable, -variable):
+        simplified = propagate(clauses, (literal,))
+        if simplified is not None:
+            remaining, assignment = simplified
+            branches.append((components(remaining), assignment))
+    return branches
+
+
+def branch(clauses):
+    """
+    Returns the variable to branch on: one in the most clauses, and of
+    those the middle one by number. Variables are numbered in the order
+    sentences mention them, so on a chain of clauses this cuts it into
+    two halves rather than taking one variable off an end.
+    """
+    occurrences = {}
+    for clause in clauses:
+        for literal in clause:
+            variable = abs(literal)
+            occurrences[variable] = occurrences.get(variable, 0) + 1
+    most = max(occurrences.values())
+    tied = sorted(
+        variable for variable, count in occurrences.items() if count == most
+    )
+    return tied[len(tied) // 2]
+
+
+def propagate(clauses, literals):
+    """
+    Sets the given literals true and propagates unit clauses. Returns
+    (clauses, assignment): the clauses not yet satisfied, without their
+    false literals, and the set of literals set true. Returns None on a
+    conflict.
+    """
+    assignment = set()
+    pending = literals
+    while True:
+        for literal in pending:
+            if -literal in assignment:
+                return None
+            assignment.add(literal)
+        pending = []
+        remaining = []
+        for clause in clauses:
+            if assignment.isdisjoint(clause):
+                kept = [literal for literal in clause
+                        if -literal not in assignment]
+                if len(kept) > 1:
+                    remaining.append(kept)
+                elif kept:
+                    pending.append(kept[0])
+                else:
+                    return None
+        clauses = remaining
+        if not pending:
+            return clauses, assignment
+
+
+def occurring(clauses):
+    """Returns the set of variables in clauses."""
+    return {abs(literal) for clause in clauses for literal in clause}
+
+
+def components(clauses):
+    """
+    Splits clauses into groups that share no variable, each as a sorted
+    tuple of sorted clause tuples so equal components compare equal.
+    """
+    parents = {}
+
+    def find(variable):
+        root = variable
+        while parents.setdefault(root, root) != root:
+            root = parents[root]
+        while parents[variable] != root:
+            parents[variable], variable = root, parents[variable]
+        return root
+
+    for clause in clauses:
+        first = find(abs(clause[0]))
+        for literal in clause[1:]:
+            root = find(abs(literal))
+            if root != first:
+                parents[root] = first
+
+    groups = {}
+    for clause in clauses:
+        groups.setdefault(find(abs(clause[0])), set()).add(
+            tuple(sorted(set(clause)))
+        )
+    return [tuple(sorted(group)) for group in groups.values()]
@@ -1,7 +1,23 @@
 import itertools
 
+import counter
+import sat
+
+# Sentences made so far, by class and then by key, see Sentence.interned
+# and Connective.interned
+interned = {}
+
 
 class Sentence():
+    """
+    Sentences are immutable and hash-consed: constructing a sentence
+    equal to one already made returns that sentence, so equal
+    subformulas are a single shared object. Equality is structural, but
+    usually settled by identity. The sentences made are kept until
+    clear_interned is called.
+    """
+
+    __slots__ = ()
 
     def evaluate(self, model):
         """Evaluates the logical sentence."""
@@ -11,9 +27,58 @@ class Sentence():
         """Returns string formula representing logical sentence."""
         return ""
 
+    def operands(self):
+        """Returns the sentences this sentence is made of."""
+        return ()
+
     def symbols(self):
         """Returns a set of all symbols in the logical sentence."""
-        return set()
+        return set(self.symbol_set())
+
+    def symbol_set(self):
+        """Returns the symbols of the sentence as a frozenset."""
+        return frozenset().union(
+            *[operand.symbol_set() for operand in self.operands()]
+        )
+
+    def __eq__(self, other):
+        return self is other or (
+            type(self) is type(other) and hash(self) == hash(other)
+            and self.operands() == other.operands()
+        )
+
+    def __hash__(self):
+        return hash((type(self), self.operands()))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("sentences are immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("sentences are immutable")
+
+    @classmethod
+    def interned(cls, key, **fields):
+        """
+        Returns the sentence of class cls with the given key, creating
+        it with the given fields if there is none. Each class has its own
+        table, so keys need not name the class, and most keys are held
+        by the sentences anyway, so interning adds little memory.
+        """
+        sentences = interned.get(cls)
+        if sentences is None:
+            sentences = interned[cls] = {}
+        sentence = sentences.get(key)
+        if sentence is None:
+            sentence = sentences[key] = cls.created(fields)
+        return sentence
+
+    @classmethod
+    def created(cls, fields):
+        """Returns a new sentence of class cls with the given fields."""
+        sentence = object.__new__(cls)
+        for name, value in fields.items():
+            object.__setattr__(sentence, name, value)
+        return sentence
 
     @classmethod
     def validate(cls, sentence):
@@ -44,14 +109,21 @@ class Sentence():
 
 class Symbol(Sentence):
 
-    def __init__(self, name):
-        self.name = name
+    __slots__ = ("name",)
+
+    def __new__(cls, name):
+        return cls.interned(name, name=name)
+
+    def __reduce__(self):
+        return (Symbol, (self.name,))
 
     def __eq__(self, other):
-        return isinstance(other, Symbol) and self.name == other.name
+        return self is other or (
+            type(other) is Symbol and self.name == other.name
+        )
 
     def __hash__(self):
-        return hash(("symbol", self.name))
+        return hash(self.name)
 
     def __repr__(self):
         return self.name
@@ -65,20 +137,20 @@ class Symbol(Sentence):
     def formula(self):
         return self.name
 
-    def symbols(self):
-        return {self.name}
+    def symbol_set(self):
+        return frozenset((self.name,))
 
 
 class Not(Sentence):
-    def __init__(self, operand):
-        Sentence.validate(operand)
-        self.operand = operand
 
-    def __eq__(self, other):
-        return isinstance(other, Not) and self.operand == other.operand
+    __slots__ = ("operand",)
 
-    def __hash__(self):
-        return hash(("not", hash(self.operand)))
+    def __new__(cls, operand):
+        Sentence.validate(operand)
+        return cls.interned(operand, operand=operand)
+
+    def __reduce__(self):
+        return (Not, (self.operand,))
 
     def __repr__(self):
         return f"Not({self.operand})"
@@ -89,23 +161,65 @@ class Not(Sentence):
     def formula(self):
         return "¬" + Sentence.parenthesize(self.operand.formula())
 
-    def symbols(self):
-        return self.operand.symbols()
+    def operands(self):
+        return (self.operand,)
 
+    def symbol_set(self):
+        return self.operand.symbol_set()
 
-class And(Sentence):
-    def __init__(self, *conjuncts):
-        for conjunct in conjuncts:
-            Sentence.validate(conjunct)
-        self.conjuncts = list(conjuncts)
 
-    def __eq__(self, other):
-        return isinstance(other, And) and self.conjuncts == other.conjuncts
+class Connective(Sentence):
+    """
+    An And, Or, Implication or Biconditional, which keeps its hash, and
+    its symbol set once first needed. Symbol and Not do not need to: a
+    symbol's name keeps its hash, and a negation has the hash and
+    symbols of its operand, one step away.
+    """
+
+    __slots__ = ("_hash", "_symbols")
+
+    @classmethod
+    def interned(cls, operands, **fields):
+        """
+        Returns the sentence of class cls with the given operands, as
+        Sentence.interned does, but keyed by its hash so that no tuple
+        of operands is kept just for the key. A sentence whose hash is
+        taken by another is just not shared.
+        """
+        code = hash((cls, operands))
+        sentences = interned.get(cls)
+        if sentences is None:
+            sentences = interned[cls] = {}
+        sentence = sentences.get(code)
+        if sentence is None or sentence.operands() != operands:
+            new = cls.created(dict(fields, _hash=code))
+            if sentence is None:
+                sentences[code] = new
+            return new
+        return sentence
 
     def __hash__(self):
-        return hash(
-            ("and", tuple(hash(conjunct) for conjunct in self.conjuncts))
-        )
+        return self._hash
+
+    def symbol_set(self):
+        try:
+            return self._symbols
+        except AttributeError:
+            object.__setattr__(self, "_symbols", Sentence.symbol_set(self))
+            return self._symbols
+
+
+class And(Connective):
+
+    __slots__ = ("conjuncts",)
+
+    def __new__(cls, *conjuncts):
+        for conjunct in conjuncts:
+            Sentence.validate(conjunct)
+        return cls.interned(conjuncts, conjuncts=conjuncts)
+
+    def __reduce__(self):
+        return (And, self.conjuncts)
 
     def __repr__(self):
         conjunctions = ", ".join(
@@ -114,8 +228,9 @@ class And(Sentence):
         return f"And({conjunctions})"
 
     def add(self, conjunct):
-        Sentence.validate(conjunct)
-        self.conjuncts.append(conjunct)
+        raise TypeError(
+            "sentences are immutable, use And(knowledge, conjunct) instead"
+        )
 
     def evaluate(self, model):
         return all(conjunct.evaluate(model) for conjunct in self.conjuncts)
@@ -126,23 +241,21 @@ class And(Sentence):
         return " ∧ ".join([Sentence.parenthesize(conjunct.formula())
                            for conjunct in self.conjuncts])
 
-    def symbols(self):
-        return set.union(*[conjunct.symbols() for conjunct in self.conjuncts])
+    def operands(self):
+        return self.conjuncts
+
+
+class Or(Connective):
 
+    __slots__ = ("disjuncts",)
 
-class Or(Sentence):
-    def __init__(self, *disjuncts):
+    def __new__(cls, *disjuncts):
         for disjunct in disjuncts:
             Sentence.validate(disjunct)
-        self.disjuncts = list(disjuncts)
+        return cls.interned(disjuncts, disjuncts=disjuncts)
 
-    def __eq__(self, other):
-        return isinstance(other, Or) and self.disjuncts == other.disjuncts
-
-    def __hash__(self):
-        return hash(
-            ("or", tuple(hash(disjunct) for disjunct in self.disjuncts))
-        )
+    def __reduce__(self):
+        return (Or, self.disjuncts)
 
     def __repr__(self):
         disjuncts = ", ".join([str(disjunct) for disjunct in self.disjuncts])
@@ -157,24 +270,22 @@ class Or(Sentence):
         return " ∨  ".join([Sentence.parenthesize(disjunct.formula())
                             for disjunct in self.disjuncts])
 
-    def symbols(self):
-        return set.union(*[disjunct.symbols() for disjunct in self.disjuncts])
+    def operands(self):
+        return self.disjuncts
+
+
+class Implication(Connective):
 
+    __slots__ = ("antecedent", "consequent")
 
-class Implication(Sentence):
-    def __init__(self, antecedent, consequent):
+    def __new__(cls, antecedent, consequent):
         Sentence.validate(antecedent)
         Sentence.validate(consequent)
-        self.antecedent = antecedent
-        self.consequent = consequent
+        return cls.interned((antecedent, consequent),
+                            antecedent=antecedent, consequent=consequent)
 
-    def __eq__(self, other):
-        return (isinstance(other, Implication)
-                and self.antecedent == other.antecedent
-                and self.consequent == other.consequent)
-
-    def __hash__(self):
-        return hash(("implies", hash(self.antecedent), hash(self.consequent)))
+    def __reduce__(self):
+        return (Implication, (self.antecedent, self.consequent))
 
     def __repr__(self):
         return f"Implication({self.antecedent}, {self.consequent})"
@@ -188,24 +299,21 @@ class Implication(Sentence):
         consequent = Sentence.parenthesize(self.consequent.formula())
         return f"{antecedent} => {consequent}"
 
-    def symbols(self):
-        return set.union(self.antecedent.symbols(), self.consequent.symbols())
+    def operands(self):
+        return (self.antecedent, self.consequent)
 
 
-class Biconditional(Sentence):
-    def __init__(self, left, right):
+class Biconditional(Connective):
+
+    __slots__ = ("left", "right")
+
+    def __new__(cls, left, right):
         Sentence.validate(left)
         Sentence.validate(right)
-        self.left = left
-        self.right = right
+        return cls.interned((left, right), left=left, right=right)
 
-    def __eq__(self, other):
-        return (isinstance(other, Biconditional)
-                and self.left == other.left
-                and self.right == other.right)
-
-    def __hash__(self):
-        return hash(("biconditional", hash(self.left), hash(self.right)))
+    def __reduce__(self):
+        return (Biconditional, (self.left, self.right))
 
     def __repr__(self):
         return f"Biconditional({self.left}, {self.right})"
@@ -221,43 +329,432 @@ class Biconditional(Sentence):
         right = Sentence.parenthesize(str(self.right))
         return f"{left} <=> {right}"
 
-    def symbols(self):
-        return set.union(self.left.symbols(), self.right.symbols())
-
-
-def model_check(knowledge, query):
-    """Checks if knowledge base entails query."""
+    def operands(self):
+        return (self.left, self.right)
 
-    def check_all(knowledge, query, symbols, model):
-        """Checks if knowledge base entails query, given a particular model."""
 
-        # If model has an assignment for each symbol
-        if not symbols:
+def clear_interned():
+    """
+    Forgets the sentences made so far, so those no longer used can be
+    freed, as batch.py does between puzzles. Sentences made afterwards
+    are new objects, but still equal to those made before.
+    """
+    interned.clear()
 
-            # If knowledge base is true in model, then query must also be true
-            if knowledge.evaluate(model):
-                return query.evaluate(model)
-            return True
-        else:
 
-            # Choose one of the remaining unused symbols
-            remaining = symbols.copy()
-            p = remaining.pop()
+def model_check(knowledge, query, method=None):
+    """
+    Checks if knowledge base entails query.
 
-            # Create a model where the symbol is true
-            model_true = model.copy()
-            model_true[p] = True
-
-            # Create a model where the symbol is false
-            model_false = model.copy()
-            model_false[p] = False
-
-            # Ensure entailment holds in both models
-            return (check_all(knowledge, query, remaining, model_true) and
-                    check_all(knowledge, query, remaining, model_false))
+    method is "truth-table", which evaluates both in every model, or
+    "sat", which searches for a model of knowledge where query is false
+    (see sat_entails). By default, truth tables are used for up to
+    TRUTH_TABLE_SYMBOLS symbols.
+    """
 
     # Get all symbols in both knowledge and query
-    symbols = set.union(knowledge.symbols(), query.symbols())
-
-    # Check that knowledge entails queryå
-    return check_all(knowledge, query, symbols, dict())
+    symbols = sorted(knowledge.symbol_set() | query.symbol_set())
+    if method is None:
+        method = ("truth-table" if len(symbols) <= TRUTH_TABLE_SYMBOLS
+                  else "sat")
+    if method == "sat":
+        return sat_entails(knowledge, query)
+    if method != "truth-table":
+        raise ValueError(f"unknown method {method!r}")
+
+    program, (knowledge, query) = compile_sentences(
+        [knowledge, query], symbols
+    )
+
+    # In every model where knowledge is true, query must also be true
+    for values, everything in truth_tables(program, len(symbols)):
+        if values[knowledge] & (everything ^ values[query]):
+            return False
+    return True
+
+
+def sat_entails(knowledge, query):
+    """
+    Checks if knowledge base entails query by showing that knowledge and
+    not query cannot both be true, with a SAT solver.
+    """
+    cnf = CNF()
+    cnf.add(knowledge)
+    negated = -cnf.literal(query)
+    solver = cnf.solver()
+    return solver.solve([negated]) is None
+
+
+def satisfiable(sentence):
+    """
+    Returns a model of sentence, as a dict from symbol name to value,
+    or None if it has none.
+    """
+    cnf = CNF()
+    cnf.add(sentence)
+    assignment = cnf.solver().solve()
+    if assignment is None:
+        return None
+    return {name: assignment[variable]
+            for name, variable in cnf.variables.items()}
+
+
+def count_models(sentence, symbols=()):
+    """
+    Returns the number of models of sentence over its symbols and any
+    other symbol names given.
+    """
+    cnf = CNF()
+    cnf.add(sentence)
+    return counter.Counter().count(cnf.clauses, cnf.scope(symbols))
+
+
+def marginals(sentence, symbols=()):
+    """
+    Returns a dict from each symbol name of sentence, and any other
+    names given, to the share of its models in which that symbol is
+    true.
+
+    Raises ValueError if sentence has no models.
+    """
+    cnf = CNF()
+    cnf.add(sentence)
+    models, trues = counter.Counter().marginals(
+        cnf.clauses, cnf.scope(symbols)
+    )
+    if not models:
+        raise ValueError("sentence has no models")
+    return {name: trues[variable] / models
+            for name, variable in cnf.variables.items()}
+
+
+class CNF():
+    """
+    Tseitin encoding of sentences as clauses over the integer variables
+    of sat.Solver. Each symbol gets a variable, and so does each distinct
+    And, Or, Implication or Biconditional, with clauses making it true
+    exactly when its subformula is; Not just negates a literal. The
+    clauses grow linearly with the sentences, unlike distributing Or
+    over And, and a subformula shared between sentences is only encoded
+    once.
+    """
+
+    def __init__(self):
+        self.variables = {}
+        self.clauses = []
+        self.count = 0
+
+        # Literal of each encoded sentence
+        self.literals = {}
+
+    def variable(self, name):
+        """Returns the variable of symbol name."""
+        if name not in self.variables:
+            self.count += 1
+            self.variables[name] = self.count
+        return self.variables[name]
+
+    def literal(self, sentence):
+        """Returns a literal that is true exactly when sentence is."""
+        if sentence in self.literals:
+            return self.literals[sentence]
+        if isinstance(sentence, Symbol):
+            literal = self.variable(sentence.name)
+        elif isinstance(sentence, Not):
+            literal = -self.literal(sentence.operand)
+        elif isinstance(sentence, And):
+            literal = self.define_or(
+                [-self.literal(conjunct) for conjunct in sentence.conjuncts]
+            )
+            literal = -literal
+        elif isinstance(sentence, Or):
+            literal = self.define_or(
+                [self.literal(disjunct) for disjunct in sentence.disjuncts]
+            )
+        elif isinstance(sentence, Implication):
+            literal = self.define_or([-self.literal(sentence.antecedent),
+                                      self.literal(sentence.consequent)])
+        elif isinstance(sentence, Biconditional):
+            left = self.literal(sentence.left)
+            right = self.literal(sentence.right)
+            self.count += 1
+            literal = self.count
+            self.clauses.extend((
+                [-literal, -left, right], [-literal, left, -right],
+                [literal, left, right], [literal, -left, -right],
+            ))
+        else:
+            raise TypeError(f"cannot encode {type(sentence).__name__}")
+        self.literals[sentence] = literal
+        return literal
+
+    def define_or(self, literals):
+        """Returns a new variable that is true exactly when any literal is."""
+        self.count += 1
+        variable = self.count
+        self.clauses.append([-variable] + literals)
+        self.clauses.extend([variable, -literal] for literal in literals)
+        return variable
+
+    def add(self, sentence):
+        """Adds clauses that make sentence true."""
+        if isinstance(sentence, And):
+            for conjunct in sentence.conjuncts:
+                self.add(conjunct)
+        elif isinstance(sentence, Or):
+            self.clauses.append(
+                [self.literal(disjunct) for disjunct in sentence.disjuncts]
+            )
+        elif isinstance(sentence, Implication):
+            self.clauses.append([-self.literal(sentence.antecedent),
+                                 self.literal(sentence.consequent)])
+        else:
+            self.clauses.append([self.literal(sentence)])
+
+    def scope(self, symbols=()):
+        """
+        Returns the set of every variable, after giving a variable to
+        each of the given symbol names. As the variables of And, Or,
+        Implication and Biconditional are fixed by their operands,
+        assignments to this set satisfying the clauses match the models
+        of the added sentences over their symbols and these.
+        """
+        for name in symbols:
+            self.variable(name)
+        return set(range(1, self.count + 1))
+
+    def solver(self):
+        """Returns a sat.Solver holding the clauses."""
+        solver = sat.Solver()
+        solver.grow(self.count)
+        for clause in self.clauses:
+            if not solver.add_clause(clause):
+                break
+        return solver
+
+
+class KnowledgeBase():
+    """
+    Knowledge that grows one sentence at a time and answers many queries.
+
+    Sentences are encoded into one SAT solver as they are added, and the
+    solver propagates unit clauses at once, which for Horn clauses is
+    forward chaining: facts() are the symbol values this fixes. Queries
+    reuse what earlier ones found. A query false in a model found before
+    needs no search, one that is entailed becomes a fact, and clauses
+    learned while answering one speed up the rest, so checking every
+    symbol of a puzzle costs about as much as solving it once.
+    """
+
+    def __init__(self, *sentences):
+        self.cnf = CNF()
+        self.solver = sat.Solver()
+        self.encoded = 0
+
+        # Answers to earlier queries, and models of the knowledge found
+        # while answering them, as dicts from symbol name to value
+        self.answers = {}
+        self.models = []
+
+        for sentence in sentences:
+            self.add(sentence)
+
+    def add(self, sentence):
+        """Adds a sentence to the knowledge."""
+        Sentence.validate(sentence)
+        self.cnf.add(sentence)
+        self.encode()
+
+        # Entailed queries stay entailed, and models that satisfy the
+        # new sentence are still models
+        self.answers = {
+            query: answer for query, answer in self.answers.items() if answer
+        }
+        self.models = [
+            model for model in self.models
+            if sentence.symbol_set() <= model.keys() and sentence.evaluate(model)
+        ]
+
+    def entails(self, query):
+        """Checks if the knowledge entails query."""
+        Sentence.validate(query)
+        if query in self.answers:
+            return self.answers[query]
+        literal = self.cnf.literal(query)
+        self.encode()
+
+        if self.solver.value(literal) > 0:
+            answer = True
+        elif any(
+            query.symbol_set() <= model.keys() and not query.evaluate(model)
+            for model in reversed(self.models)
+        ):
+            answer = False
+        else:
+            assignment = self.solver.solve([-literal])
+            answer = assignment is None
+            if answer:
+                self.solver.add_clause([literal])
+            else:
+                self.models.append(self.model(assignment))
+        self.answers[query] = answer
+        return answer
+
+    def consistent(self):
+        """Checks if the knowledge has a model."""
+        if self.models:
+            return True
+        assignment = self.solver.solve()
+        if assignment is None:
+            return False
+        self.models.append(self.model(assignment))
+        return True
+
+    def determined(self, names=None):
+        """
+        Returns a dict from the name of each symbol whose value the
+        knowledge entails to that value, out of the given names or every
+        symbol in the knowledge.
+        """
+        if names is None:
+            names = sorted(self.cnf.variables)
+        values = {}
+        for name in names:
+            symbol = Symbol(name)
+            if self.entails(symbol):
+                values[name] = True
+            elif self.entails(Not(symbol)):
+                values[name] = False
+        return values
+
+    def facts(self):
+        """
+        Returns a dict from the name of each symbol that unit propagation
+        has fixed to its value.
+        """
+        return {
+            name: self.solver.value(variable) > 0
+            for name, variable in self.cnf.variables.items()
+            if self.solver.value(variable) != 0
+        }
+
+    def encode(self):
+        """Passes clauses the encoding gained to the solver."""
+        self.solver.grow(self.cnf.count)
+        for clause in self.cnf.clauses[self.encoded:]:
+            self.solver.add_clause(clause)
+        self.encoded = len(self.cnf.clauses)
+
+    def model(self, assignment):
+        return {name: assignment[variable]
+                for name, variable in self.cnf.variables.items()}
+
+
+# Operations of a compiled program, see compile_sentences
+SYMBOL, NOT, AND, OR, IMPLIES, IFF = range(6)
+
+# Most symbols for which model_check uses truth tables by default
+TRUTH_TABLE_SYMBOLS = 16
+
+# Most symbols whose models are evaluated together as the bits of one
+# integer; models of any further symbols are enumerated in turn
+CHUNK_SYMBOLS = 20
+
+
+def compile_sentences(sentences, symbols):
+    """
+    Lowers sentences to a program of bitwise operations over truth
+    tables, where symbols is the list of symbol names they use.
+
+    Returns (program, outputs): program is a list of (operation,
+    arguments) steps, each computing the truth table of one distinct
+    subformula from those of earlier steps, and outputs gives the step
+    holding each sentence. A subformula shared between sentences, or
+    within one, is only computed once.
+    """
+    positions = {name: i for i, name in enumerate(symbols)}
+    program = []
+    steps = {}
+
+    def lower(sentence):
+        if sentence in steps:
+            return steps[sentence]
+        if isinstance(sentence, Symbol):
+            step = (SYMBOL, positions[sentence.name])
+        elif isinstance(sentence, Not):
+            step = (NOT, lower(sentence.operand))
+        elif isinstance(sentence, And):
+            step = (AND, tuple(map(lower, sentence.conjuncts)))
+        elif isinstance(sentence, Or):
+            step = (OR, tuple(map(lower, sentence.disjuncts)))
+        elif isinstance(sentence, Implication):
+            step = (IMPLIES, (lower(sentence.antecedent),
+                              lower(sentence.consequent)))
+        elif isinstance(sentence, Biconditional):
+            step = (IFF, (lower(sentence.left), lower(sentence.right)))
+        else:
+            raise TypeError(f"cannot compile {type(sentence).__name__}")
+        program.append(step)
+        steps[sentence] = len(program) - 1
+        return steps[sentence]
+
+    outputs = [lower(sentence) for sentence in sentences]
+    return program, outputs
+
+
+def truth_tables(program, count):
+    """
+    Runs a compiled program over every model of `count` symbols, in
+    chunks of up to 2 ** CHUNK_SYMBOLS models. Bit b of a truth table
+    is the value in the model where symbol i is true exactly when bit i
+    of b is set, with the symbols beyond CHUNK_SYMBOLS fixed for each
+    chunk.
+
+    Yields (values, everything) for each chunk, where values holds the
+    truth table computed by each step and everything has a bit set for
+    every model in the chunk.
+    """
+    low = min(count, CHUNK_SYMBOLS)
+    everything = (1 << (1 << low)) - 1
+    patterns = [symbol_pattern(i, low) for i in range(low)]
+
+    for chunk in range(1 << (count - low)):
+        tables = patterns + [
+            everything if chunk >> i & 1 else 0 for i in range(count - low)
+        ]
+        values = []
+        for operation, arguments in program:
+            if operation == SYMBOL:
+                value = tables[arguments]
+            elif operation == NOT:
+                value = everything ^ values[arguments]
+            elif operation == AND:
+                value = everything
+                for argument in arguments:
+                    value &= values[argument]
+            elif operation == OR:
+                value = 0
+                for argument in arguments:
+                    value |= values[argument]
+            elif operation == IMPLIES:
+                antecedent, consequent = arguments
+                value = (everything ^ values[antecedent]) | values[consequent]
+            else:
+                left, right = arguments
+                value = everything ^ values[left] ^ values[right]
+            values.append(value)
+        yield values, everything
+
+
+def symbol_pattern(i, count):
+    """
+    Returns the truth table of symbol i over the 2 ** count models of
+    count symbols: alternating runs of 2 ** i false and true models.
+    """
+    run = 1 << i
+    pattern = ((1 << run) - 1) << run
+    length = 2 * run
+    while length < 1 << count:
+        pattern |= pattern << length
+        length *= 2
+    return pattern
@@ -0,0 +1,312 @@
+"""
+Conflict-driven clause learning (CDCL) SAT solver for logic.py.
+
+Variables are the integers 1, 2, ... and a literal is a variable or its
+negation; a clause is a list of literals, as in the DIMACS format. The
+solver is a compact version of the MiniSat design:
+
+- Unit propagation with two watched literals per clause, so assigning a
+  literal only visits the clauses watching its negation.
+- On a conflict, the first unique implication point is learned as a new
+  clause and the search jumps back to the level where that clause
+  becomes unit.
+- Decisions take the unassigned variable with the highest activity,
+  which is bumped for every variable in a conflict and decays over
+  time, and set it to the value it last had (phase saving).
+- Restarts follow the Luby sequence, keeping the learned clauses.
+
+Clauses can be added between calls to solve, and solve takes
+assumptions, literals held true for one call only, so one solver can
+answer many queries against the same clauses.
+"""
+
+import heapq
+
+# Conflicts before the first restart, scaled by the Luby sequence
+RESTART_BASE = 100
+
+# Activity decay per conflict, as the factor the bump grows by
+ACTIVITY_DECAY = 1 / 0.95
+
+# Activities are rescaled before they overflow
+ACTIVITY_LIMIT = 1e100
+
+
+class Solver():
+
+    def __init__(self):
+        self.count = 0
+        self.clauses = []
+
+        # Per variable, indexed from 1: value (1 true, -1 false, 0 not
+        # assigned), decision level, reason clause, activity and phase
+        self.values = [0]
+        self.levels = [0]
+        self.reasons = [None]
+        self.activity = [0.0]
+        self.phases = [-1]
+
+        # Clauses watching each literal, see watching
+        self.watches = [[], []]
+
+        self.trail = []
+        self.trail_limits = []
+        self.head = 0
+        self.order = []
+        self.bump = 1.0
+        self.inconsistent = False
+
+    def grow(self, count):
+        """Makes room for variables up to count."""
+        while self.count < count:
+            self.count += 1
+            self.values.append(0)
+            self.levels.append(0)
+            self.reasons.append(None)
+            self.activity.append(0.0)
+            self.phases.append(-1)
+            self.watches.extend(([], []))
+            heapq.heappush(self.order, (0.0, self.count))
+
+    def add_clause(self, literals):
+        """
+        Adds a clause. Returns False if the clauses are now known to be
+        unsatisfiable.
+        """
+        if self.inconsistent:
+            return False
+        self.backtrack(0)
+        self.grow(max(map(abs, literals), default=0))
+
+        clause = []
+        values = self.values
+        for literal in dict.fromkeys(literals):
+            if -literal in clause:
+                return True
+            value = values[literal] if literal > 0 else -values[-literal]
+            if value > 0:
+                return True
+            if value == 0:
+                clause.append(literal)
+
+        if not clause:
+            self.inconsistent = True
+        elif len(clause) == 1:
+            self.assign(clause[0], None)
+            if self.propagate() is not None:
+                self.inconsistent = True
+        else:
+            self.attach(clause)
+        return not self.inconsistent
+
+    def solve(self, assumptions=()):
+        """
+        Returns a satisfying assignment, as a list whose item v is the
+        value of variable v (item 0 is unused), or None if there is none
+        in which every assumption literal is true.
+        """
+        if self.inconsistent:
+            return None
+        self.backtrack(0)
+        self.grow(max(map(abs, assumptions), default=0))
+
+        conflicts = 0
+        restarts = 0
+        limit = RESTART_BASE * luby(restarts)
+        while True:
+            conflict = self.propagate()
+            if conflict is not None:
+                if not self.trail_limits:
+                    self.inconsistent = True
+                    return None
+                learned, level = self.analyze(conflict)
+                self.backtrack(level)
+                if len(learned) == 1:
+                    self.assign(learned[0], None)
+                else:
+                    self.assign(learned[0], self.attach(learned))
+                self.bump *= ACTIVITY_DECAY
+
+                conflicts += 1
+                if conflicts >= limit:
+                    self.backtrack(0)
+                    conflicts = 0
+                    restarts += 1
+                    limit = RESTART_BASE * luby(restarts)
+                continue
+
+            # Assumptions are the first decisions, one level each
+            level = len(self.trail_limits)
+            if level < len(assumptions):
+                literal = assumptions[level]
+                value = self.value(literal)
+                if value < 0:
+                    self.backtrack(0)
+                    return None
+                self.trail_limits.append(len(self.trail))
+                if value == 0:
+                    self.assign(literal, None)
+                continue
+
+            variable = self.pick()
+            if variable is None:
+                model = [value > 0 for value in self.values]
+                self.backtrack(0)
+                return model
+            self.trail_limits.append(len(self.trail))
+            self.assign(variable * self.phases[variable], None)
+
+    def value(self, literal):
+        value = self.values[abs(literal)]
+        return value if literal > 0 else -value
+
+    def assign(self, literal, reason):
+        variable = abs(literal)
+        self.values[variable] = 1 if literal > 0 else -1
+        self.levels[variable] = len(self.trail_limits)
+        self.reasons[variable] = reason
+        self.trail.append(literal)
+
+    def attach(self, clause):
+        """Adds a clause of two or more literals, watching the first two."""
+        self.clauses.append(clause)
+        index = len(self.clauses) - 1
+        self.watching(clause[0]).append(index)
+        self.watching(clause[1]).append(index)
+        return index
+
+    def watching(self, literal):
+        """Returns the list of clauses watching literal."""
+        return self.watches[2 * abs(literal) + (literal < 0)]
+
+    def propagate(self):
+        """
+        Assigns every literal implied by unit clauses. Returns the
+        index of a clause all of whose literals are false, or None.
+        """
+        while self.head < len(self.trail):
+            false = -self.trail[self.head]
+            self.head += 1
+            watchers = self.watching(false)
+            kept = []
+            for position, index in enumerate(watchers):
+                clause = self.clauses[index]
+                if clause[0] == false:
+                    clause[0], clause[1] = clause[1], clause[0]
+                if self.value(clause[0]) > 0:
+                    kept.append(index)
+                    continue
+
+                # Watch another literal that is not false, if any
+                for k in range(2, len(clause)):
+                    if self.value(clause[k]) >= 0:
+                        clause[1], clause[k] = clause[k], clause[1]
+                        self.watching(clause[1]).append(index)
+                        break
+                else:
+                    kept.append(index)
+                    if self.value(clause[0]) < 0:
+                        kept.extend(watchers[position + 1:])
+                        watchers[:] = kept
+                        return index
+                    self.assign(clause[0], index)
+            watchers[:] = kept
+        return None
+
+    def analyze(self, conflict):
+        """
+        Returns (clause, level): the clause learned from a conflict, with
+        its literal of the current level first and one of the highest
+        remaining level second, and the level to jump back to.
+        """
+        level = len(self.trail_limits)
+        seen = set()
+        learned = [None]
+        pending = 0
+        literal = None
+        position = len(self.trail) - 1
+        clause = self.clauses[conflict]
+        while True:
+            for other in clause if literal is None else clause[1:]:
+                variable = abs(other)
+                if variable in seen or self.levels[variable] == 0:
+                    continue
+                seen.add(variable)
+                self.raise_activity(variable)
+                if self.levels[variable] == level:
+                    pending += 1
+                else:
+                    learned.append(other)
+
+            # Resolve with the reason of the latest literal involved
+            while abs(self.trail[position]) not in seen:
+                position -= 1
+            literal = self.trail[position]
+            position -= 1
+            pending -= 1
+            if pending == 0:
+                break
+            clause = self.clauses[self.reasons[abs(literal)]]
+
+        learned[0] = -literal
+        if len(learned) == 1:
+            return learned, 0
+        highest = max(
+            range(1, len(learned)), key=lambda i: self.levels[abs(learned[i])]
+        )
+        learned[1], learned[highest] = learned[highest], learned[1]
+        return learned, self.levels[abs(learned[1])]
+
+    def backtrack(self, level):
+        """Undoes every assignment above the given decision level."""
+        if len(self.trail_limits) <= level:
+            return
+        start = self.trail_limits[level]
+        for literal in self.trail[start:]:
+            variable = abs(literal)
+            self.phases[variable] = self.values[variable]
+            self.values[variable] = 0
+            self.reasons[variable] = None
+            heapq.heappush(self.order, (-self.activity[variable], variable))
+        del self.trail[start:]
+        del self.trail_limits[level:]
+        self.head = min(self.head, start)
+
+    def pick(self):
+        """Returns the unassigned variable with the highest activity."""
+        while self.order:
+            activity, variable = heapq.heappop(self.order)
+            if self.values[variable] == 0 and -activity == self.activity[variable]:
+                return variable
+        for variable in range(1, self.count + 1):
+            if self.values[variable] == 0:
+                return variable
+        return None
+
+    def raise_activity(self, variable):
+        self.activity[variable] += self.bump
+        if self.activity[variable] > ACTIVITY_LIMIT:
+            self.activity = [
+                activity / ACTIVITY_LIMIT for activity in self.activity
+            ]
+            self.bump /= ACTIVITY_LIMIT
+            self.order = [
+                (-self.activity[v], v) for v in range(1, self.count + 1)
+                if self.values[v] == 0
+            ]
+            heapq.heapify(self.order)
+        elif self.values[variable] == 0:
+            heapq.heappush(self.order, (-self.activity[variable], variable))
+
+
+def luby(i):
+    """Returns item i (from 0) of the Luby sequence 1, 1, 2, 1, 1, 2, 4..."""
+    size, power = 1, 0
+    while size < i + 1:
+        power += 1
+        size = 2 * size + 1
+    while size - 1 != i:
+        size = (size - 1) // 2
+        power -= 1
+        i %= size
+    return 1 << power
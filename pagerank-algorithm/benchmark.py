@@ -0,0 +1,66 @@
+"""
+Benchmark comparing the PageRank solvers in linkgraph.py on synthetic
+power-law link graphs, at several damping factors. Each solver is run
+to the same L1 threshold and its ranks are compared with a reference
+from power iteration run to REFERENCE_THRESHOLD.
+
+Usage: python benchmark.py [pages] [threshold]
+"""
+
+import sys
+import time
+
+import numpy as np
+
+from generate import DANGLING, EXPONENT, power_law_links
+from linkgraph import SOLVERS, LinkGraph, power_iteration, solve
+
+PAGES = 100_000
+THRESHOLD = 1e-8
+DAMPINGS = (0.5, 0.85, 0.99)
+
+REFERENCE_THRESHOLD = 1e-12
+
+
+def main():
+    if len(sys.argv) > 3:
+        sys.exit("Usage: python benchmark.py [pages] [threshold]")
+    pages = int(sys.argv[1]) if len(sys.argv) > 1 else PAGES
+    threshold = float(sys.argv[2]) if len(sys.argv) > 2 else THRESHOLD
+
+    graph = power_law_graph(pages)
+    print(
+        f"{len(graph)} pages, {len(graph.links)} links, "
+        f"{graph.dangling.sum()} dangling, threshold {threshold:g}"
+    )
+    print(
+        f"{'damping':>8}  {'solver':>13}  {'iterations':>10}  "
+        f"{'seconds':>8}  {'L1 error':>9}"
+    )
+    for damping in DAMPINGS:
+        reference, _ = power_iteration(graph, damping, REFERENCE_THRESHOLD)
+        for method in SOLVERS:
+            start = time.perf_counter()
+            ranks, residuals = solve(graph, damping, threshold, method=method)
+            seconds = time.perf_counter() - start
+            error = np.abs(ranks - reference).sum()
+            print(
+                f"{damping:>8}  {method:>13}  {len(residuals):>10}  "
+                f"{seconds:>8.3f}  {error:>9.2e}"
+            )
+
+
+def power_law_graph(pages, exponent=EXPONENT, dangling=DANGLING, seed=0):
+    """
+    Returns a LinkGraph on `pages` pages with Zipf-distributed
+    out-degrees, where links prefer pages with a Zipf-distributed
+    popularity and a `dangling` share of pages have no links.
+    """
+    rng = np.random.default_rng(seed)
+    degrees, links = power_law_links(pages, rng, exponent, dangling)
+    offsets = np.concatenate(([0], np.cumsum(degrees)))
+    return LinkGraph.from_links(range(pages), offsets, links)
+
+
+if __name__ == "__main__":
+    main()
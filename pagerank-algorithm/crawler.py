@@ -0,0 +1,242 @@
+"""
+Parallel streaming crawler for pagerank.crawl.
+
+Every .html file below the corpus directory is a page, named by its
+path relative to that directory with "/" separators ("ai.html",
+"topics/search.html"). Files are read in CHUNK_SIZE pieces and fed to
+an incremental tokenizer, so no page is ever held in memory whole: it
+skips comments, finds <a> start tags (any case, with double, single or
+unquoted attribute values) and keeps only their href, carrying an
+unfinished tag over to the next chunk and remembering when a chunk ends
+inside a comment. Links are resolved relative to
+the linking page's directory (or to the corpus root if they start with
+"/"), with any query or fragment dropped; links with a scheme or host
+point outside the corpus and are ignored.
+
+Pages are parsed across a pool of worker processes, or threads.
+"""
+
+import functools
+import html
+import multiprocessing
+import multiprocessing.pool
+import os
+import posixpath
+import re
+import time
+from urllib.parse import unquote, urlsplit
+
+# Bytes of a page read and tokenized at a time
+CHUNK_SIZE = 1 << 16
+
+# Pages handed to a worker at a time
+CHUNKSIZE = 64
+
+# Longest unfinished tag carried over to the next chunk
+MAX_TAG = 4096
+
+# Distinct (directory, href) pairs whose resolution is remembered
+RESOLVE_CACHE = 1 << 16
+
+# Pool kinds understood by crawl
+POOLS = ("process", "thread")
+
+# A comment, complete or not, or an <a> start tag with its attributes
+TOKEN = re.compile(
+    r"""<!--(?:.*?-->)?|<a(\s(?:"[^"]*"|'[^']*'|[^'">])*)?/?>""",
+    re.IGNORECASE | re.DOTALL
+)
+
+# One attribute of a start tag, with its value if it has one
+ATTRIBUTE = re.compile(
+    r"""([^\s"'>/=]+)(?:\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s"'>]+)))?"""
+)
+
+
+class LinkParser():
+    """
+    Collects the set of page names that the <a> tags fed to it link
+    to, resolved from `page`.
+    """
+
+    def __init__(self, page):
+        self.page = page
+        self.links = set()
+        self.pending = ""
+        # Whether the text fed so far ends inside a comment, and its
+        # last two characters, which may start the "-->" closing it
+        self.comment = False
+        self.tail = ""
+
+    def feed(self, data):
+        if self.comment:
+            data = self.tail + data
+            close = data.find("-->")
+            if close < 0:
+                self.tail = data[-2:]
+                return
+            self.comment = False
+            data = data[close + 3:]
+
+        data = self.pending + data
+        end = 0
+        for match in TOKEN.finditer(data):
+            text = match.group()
+            if text.startswith("<!--"):
+                if len(text) < 7 or not text.endswith("-->"):
+                    # The comment ends in a later chunk
+                    self.comment = True
+                    self.tail = data[match.start() + 4:][-2:]
+                    self.pending = ""
+                    return
+            elif match.group(1):
+                self.handle_link(match.group(1))
+            end = match.end()
+
+        # Keep what may be a tag still open at the end of the chunk
+        rest = data[end:]
+        tag = rest.rfind("<")
+        if tag >= 0 and len(rest) - tag <= MAX_TAG:
+            self.pending = rest[tag:]
+        else:
+            self.pending = ""
+
+    def close(self):
+        self.pending = ""
+        self.comment = False
+        self.tail = ""
+
+    def handle_link(self, attributes):
+        for match in ATTRIBUTE.finditer(attributes):
+            if match.group(1).lower() != "href":
+                continue
+            value = next(
+                (value for value in match.groups()[1:] if value is not None),
+                None
+            )
+            if value is not None:
+                if "&" in value:
+                    value = html.unescape(value)
+                link = resolve(self.page, value)
+                if link is not None:
+                    self.links.add(link)
+            return
+
+
+def crawl(directory, workers=None, pool="process"):
+    """
+    Parses every page below directory, across `workers` processes or
+    threads (default one per CPU) as chosen by `pool`.
+
+    Returns (corpus, stats): corpus maps each page to the set of other
+    pages in the corpus it links to, and stats is a dictionary of
+    pages, links (kept in the corpus), parsed (pages read), seconds and
+    pages_per_second.
+    """
+    start = time.perf_counter()
+    pages = list(find_pages(directory))
+    results = parse(directory, pages, workers, pool)
+    corpus = link_corpus(pages, dict(results))
+    return corpus, crawl_stats(corpus, len(pages), start)
+
+
+def parse(directory, pages, workers=None, pool="process"):
+    """
+    Returns a list of (page, links) pairs for the given pages below
+    directory, in any order, where links is the set of page names the
+    page's <a> tags point to.
+    """
+    if pool not in POOLS:
+        raise ValueError(f"pool must be one of {', '.join(POOLS)}")
+    tasks = ((directory, page) for page in pages)
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(pages) <= CHUNKSIZE:
+        return list(map(extract_links, tasks))
+
+    kind = multiprocessing.Pool if pool == "process" else (
+        multiprocessing.pool.ThreadPool
+    )
+    with kind(workers) as executor:
+        return list(executor.imap_unordered(extract_links, tasks, CHUNKSIZE))
+
+
+def link_corpus(pages, links):
+    """
+    Returns the corpus dictionary for a list of pages, given a mapping
+    from each page to every name it links to. Only links to other pages
+    in the corpus are kept.
+    """
+    corpus = dict.fromkeys(pages)
+    for page in corpus:
+        corpus[page] = {
+            link for link in links[page] if link in corpus and link != page
+        }
+    return corpus
+
+
+def crawl_stats(corpus, parsed, start):
+    """Returns the stats dictionary of crawl for a finished corpus."""
+    seconds = time.perf_counter() - start
+    return {
+        "pages": len(corpus),
+        "links": sum(map(len, corpus.values())),
+        "parsed": parsed,
+        "seconds": seconds,
+        "pages_per_second": len(corpus) / seconds if seconds else 0,
+    }
+
+
+def find_pages(directory, stats=False):
+    """
+    Yields the name of every .html page below directory, in sorted
+    order, or with `stats` (name, os.stat_result) pairs.
+    """
+    with os.scandir(directory) as scan:
+        entries = sorted(scan, key=lambda entry: entry.name)
+    for entry in entries:
+        if entry.is_dir():
+            for page in find_pages(entry.path, stats):
+                if stats:
+                    yield f"{entry.name}/{page[0]}", page[1]
+                else:
+                    yield f"{entry.name}/{page}"
+        elif entry.name.endswith(".html") and entry.is_file():
+            yield (entry.name, entry.stat()) if stats else entry.name
+
+
+def extract_links(task):
+    """
+    Returns (page, links) for one (directory, page) task, where links
+    is the set of page names the page's <a> tags point to.
+    """
+    directory, page = task
+    parser = LinkParser(page)
+    path = os.path.join(directory, *page.split("/"))
+    with open(path, encoding="utf-8", errors="replace") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), ""):
+            parser.feed(chunk)
+    parser.close()
+    return page, parser.links
+
+
+def resolve(page, href):
+    """
+    Returns the page name href refers to from page, or None if it
+    points outside the corpus.
+    """
+    return resolve_from(posixpath.dirname(page), href)
+
+
+@functools.lru_cache(maxsize=RESOLVE_CACHE)
+def resolve_from(folder, href):
+    """Resolves href from a page in folder, see resolve."""
+    parts = urlsplit(href.strip())
+    if parts.scheme or parts.netloc or not parts.path:
+        return None
+    path = unquote(parts.path)
+    if not path.startswith("/"):
+        path = posixpath.join(folder, path)
+    path = posixpath.normpath(path).lstrip("/")
+    if path == ".." or path.startswith("../"):
+        return None
+    return path
@@ -0,0 +1,175 @@
+"""
+Synthetic HTML corpora for benchmarking pagerank.py at scale.
+
+Pages are spread over subdirectories of FOLDER_SIZE pages each and link
+to each other by relative paths ("../d0001/p0001234.html"). Out-degrees
+follow a Zipf law, links prefer pages with a Zipf-distributed
+popularity, a share of pages have no links at all, and some links point
+back to their own page or outside the corpus, as crawl must ignore
+both. A corpus.json manifest records how a corpus was generated, so an
+existing one with the same parameters is reused, and one with other
+parameters is never written over.
+
+Usage: python generate.py directory pages [seed]
+"""
+
+import json
+import os
+import sys
+
+import numpy as np
+
+# Out-degrees and page popularity follow a Zipf law with this exponent
+EXPONENT = 2.1
+
+# Share of pages without links
+DANGLING = 0.1
+
+# Share of pages that also link to themselves
+SELF_LINKS = 0.05
+
+# Share of links that point to another site
+EXTERNAL = 0.02
+
+# Cap on the out-degree of a single page
+MAX_DEGREE = 1_000
+
+# Pages per subdirectory
+FOLDER_SIZE = 1_000
+
+MANIFEST = "corpus.json"
+
+
+def main():
+    if len(sys.argv) not in (3, 4):
+        sys.exit("Usage: python generate.py directory pages [seed]")
+    seed = int(sys.argv[3]) if len(sys.argv) == 4 else 0
+    manifest = generate(sys.argv[1], int(sys.argv[2]), seed)
+    print(
+        f"{manifest['pages']} pages, {manifest['links']} links, "
+        f"{manifest['dangling']} dangling in {sys.argv[1]}"
+    )
+
+
+def generate(directory, pages, seed=0):
+    """
+    Writes a corpus of `pages` pages to directory, unless one generated
+    with the same parameters is already there. Returns its manifest: the
+    parameters, and how many links (to other pages, as crawl counts
+    them) and dangling pages (without such links) it has.
+
+    Raises ValueError if directory holds a corpus generated differently.
+    """
+    parameters = {
+        "pages": pages, "seed": seed, "exponent": EXPONENT,
+        "dangling_share": DANGLING, "self_links": SELF_LINKS,
+        "external": EXTERNAL, "folder_size": FOLDER_SIZE,
+    }
+    existing = read_manifest(directory)
+    if existing is not None:
+        if any(existing.get(key) != value for key, value in parameters.items()):
+            raise ValueError(f"{directory} holds another generated corpus")
+        return existing
+
+    rng = np.random.default_rng(seed)
+    degrees, targets = power_law_links(pages, rng)
+    external = rng.random(targets.size) < EXTERNAL
+    self_links = (rng.random(pages) < SELF_LINKS) & (degrees > 0)
+    offsets = np.concatenate(([0], np.cumsum(degrees)))
+
+    links = 0
+    dangling = 0
+    for folder in range(-(-pages // FOLDER_SIZE)):
+        os.makedirs(os.path.join(directory, folder_name(folder)),
+                    exist_ok=True)
+    for page in range(pages):
+        hrefs = []
+        kept = set()
+        for target, outside in zip(
+            targets[offsets[page]:offsets[page + 1]].tolist(),
+            external[offsets[page]:offsets[page + 1]].tolist()
+        ):
+            if outside:
+                hrefs.append(f"https://example.com/{target}.html")
+            else:
+                hrefs.append(relative_path(page, target))
+                if target != page:
+                    kept.add(target)
+        if self_links[page]:
+            hrefs.append(relative_path(page, page))
+        links += len(kept)
+        dangling += not kept
+        with open(os.path.join(directory, page_name(page)), "w") as f:
+            f.write(page_html(page, hrefs))
+
+    manifest = dict(parameters, links=links, dangling=dangling)
+    with open(os.path.join(directory, MANIFEST), "w") as f:
+        json.dump(manifest, f)
+    return manifest
+
+
+def power_law_links(pages, rng, exponent=EXPONENT, dangling=DANGLING):
+    """
+    Returns (degrees, targets) for a random link graph on `pages` pages:
+    Zipf-distributed out-degrees, with a `dangling` share set to zero,
+    and the targets of every page's links in page order, preferring
+    pages with a Zipf-distributed popularity.
+    """
+    degrees = np.minimum(rng.zipf(exponent, pages), MAX_DEGREE)
+    degrees[rng.random(pages) < dangling] = 0
+    popularity = rng.zipf(exponent, pages).astype(float)
+    targets = rng.choice(
+        pages, size=degrees.sum(), p=popularity / popularity.sum()
+    )
+    return degrees, targets
+
+
+def read_manifest(directory):
+    try:
+        with open(os.path.join(directory, MANIFEST)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def folder_name(folder):
+    return f"d{folder:04d}"
+
+
+def page_name(page):
+    """Returns the path of page number `page` within the corpus."""
+    return f"{folder_name(page // FOLDER_SIZE)}/p{page:07d}.html"
+
+
+def relative_path(page, target):
+    """Returns the href from page to target."""
+    if page // FOLDER_SIZE == target // FOLDER_SIZE:
+        return page_name(target).split("/")[1]
+    return f"../{page_name(target)}"
+
+
+def page_html(page, hrefs):
+    """Returns the HTML of a page, laid out like the bundled corpora."""
+    anchors = "\n".join(
+        f'            <li><a href="{href}">Link {i}</a></li>'
+        for i, href in enumerate(hrefs)
+    )
+    return f"""<!DOCTYPE html>
+<html lang="en">
+    <head>
+        <title>{page}</title>
+    </head>
+    <body>
+        <h1>{page}</h1>
+
+        <div>Links:</div>
+        <ul>
+{anchors}
+        </ul>
+    </body>
+</html>
+"""
+
+
+if __name__ == "__main__":
+    main()
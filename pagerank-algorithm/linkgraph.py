@@ -0,0 +1,442 @@
+"""
+Sparse link-graph representation of a PageRank corpus.
+
+Pages are numbered in sorted order. The link structure is stored as
+the transposed transition matrix in SciPy CSR form, so that for a rank
+vector r the rank each page receives through links is `matrix @ r`:
+matrix[j, i] = 1 / len(corpus[i]) when page i links to page j. Pages
+without links are flagged in `dangling`; as in transition_model, a
+random surfer on a dangling page jumps to any page uniformly.
+
+The same links are also kept by source page for random walks: page i
+links to links[offsets[i]:offsets[i + 1]].
+
+Ranks are computed by one of the SOLVERS: plain power iteration,
+Gauss-Seidel sweeps, power iteration with periodic Aitken or quadratic
+extrapolation, or adaptive power iteration that freezes converged pages.
+Each returns the rank vector and the residual after every iteration.
+personalized_iteration solves for many teleport distributions at once.
+"""
+
+import numpy as np
+import scipy.sparse
+import scipy.sparse.linalg
+
+
+class LinkGraph():
+
+    def __init__(self, pages, matrix, dangling, offsets, links):
+        self.pages = pages
+        self.matrix = matrix
+        self.dangling = dangling
+        self.offsets = offsets
+        self.links = links
+
+    def __len__(self):
+        return len(self.pages)
+
+    @classmethod
+    def from_corpus(cls, corpus):
+        """
+        Builds a LinkGraph from a crawl-style dictionary mapping each
+        page to the set of pages it links to.
+        """
+        pages = sorted(corpus)
+        index = {page: i for i, page in enumerate(pages)}
+        targets = []
+        known = np.zeros(len(pages), dtype=np.int64)
+        degrees = np.zeros(len(pages), dtype=np.int64)
+        for i, page in enumerate(pages):
+            links = corpus[page]
+            start = len(targets)
+            targets.extend([index[link] for link in links if link in index])
+            known[i] = len(targets) - start
+            degrees[i] = len(links)
+        offsets = np.concatenate(([0], np.cumsum(known)))
+        return cls.from_links(pages, offsets, targets, degrees)
+
+    @classmethod
+    def from_links(cls, pages, offsets, links, degrees=None):
+        """
+        Builds a LinkGraph for a list of pages where page i links to the
+        page numbers links[offsets[i]:offsets[i + 1]]. `degrees` gives
+        each page's full number of links, where some of them point
+        outside the graph; by default every link is in links.
+        """
+        offsets = np.asarray(offsets, dtype=np.int64)
+        targets = np.asarray(links, dtype=np.int64)
+        known = np.diff(offsets)
+        degrees = known if degrees is None else np.asarray(degrees)
+
+        # Each of page i's links carries 1 / len(corpus[i]) of its rank
+        sources = np.repeat(np.arange(len(pages)), known)
+        weights = 1 / degrees[sources]
+        matrix = scipy.sparse.csr_matrix(
+            (weights, (targets, sources)), shape=(len(pages), len(pages))
+        )
+        dangling = degrees == 0
+        return cls(pages, matrix, dangling, offsets, targets)
+
+    def ranks(self, vector):
+        """Returns a {page: rank} dictionary for a rank vector."""
+        return {page: float(rank) for page, rank in zip(self.pages, vector)}
+
+    def vector(self, ranks):
+        """
+        Returns a rank vector summing to 1 from a {page: rank}
+        dictionary, such as one for an earlier version of the corpus.
+        Pages missing from it start at 1 / N before normalizing.
+        """
+        n = len(self.pages)
+        vector = np.array([ranks.get(page, 1 / n) for page in self.pages])
+        total = vector.sum()
+        return vector / total if total > 0 else np.full(n, 1 / n)
+
+    def teleports(self, distributions):
+        """
+        Returns an (N, k) matrix whose columns are k teleport
+        distributions, each given as a {page: weight} dictionary and
+        scaled to sum to 1. Pages outside the graph are ignored.
+        """
+        index = {page: i for i, page in enumerate(self.pages)}
+        matrix = np.zeros((len(self.pages), len(distributions)))
+        for column, weights in enumerate(distributions):
+            for page, weight in weights.items():
+                if page in index:
+                    matrix[index[page], column] = weight
+            total = matrix[:, column].sum()
+            if total <= 0:
+                raise ValueError("teleport distribution has no weight")
+            matrix[:, column] /= total
+        return matrix
+
+
+def power_iteration(graph, damping_factor, threshold=0.001, start=None):
+    """
+    Returns (ranks, residuals) for graph by repeatedly applying
+
+        r' = (1 - d) / N + d * (matrix @ r + sum(r[dangling]) / N)
+
+    from `start` (default uniform) until the L1 norm of the change in
+    the rank vector is below threshold. residuals lists that change
+    after every iteration, so its length is the number of iterations.
+    """
+    ranks = initial(graph, start)
+    residuals = []
+    while True:
+        new_ranks = step(graph, ranks, damping_factor)
+        residuals.append(np.abs(new_ranks - ranks).sum())
+        ranks = new_ranks
+        if residuals[-1] < threshold:
+            return ranks, residuals
+
+
+def gauss_seidel(graph, damping_factor, threshold=0.001, start=None):
+    """
+    Returns (ranks, residuals) like power_iteration, using Gauss-Seidel
+    sweeps. With uniform teleport and dangling jumps, PageRank is the
+    normalized solution of the linear system (I - d * matrix) x = 1 / N,
+    whose dangling columns are empty. Each sweep solves the triangular
+    system with the lower part of I - d * matrix, so pages use the
+    ranks already updated in the same sweep; residuals are the L1
+    change of the normalized ranks.
+    """
+    n = len(graph)
+    system = scipy.sparse.identity(n, format="csr") - (
+        damping_factor * graph.matrix
+    )
+    upper = scipy.sparse.triu(system, k=1, format="csr")
+    right = np.full(n, 1 / n)
+
+    # Factoring the lower part in its natural order leaves it as it is,
+    # but lets SuperLU do the triangular solves
+    lower = scipy.sparse.linalg.splu(
+        scipy.sparse.tril(system, format="csc"), permc_spec="NATURAL",
+        diag_pivot_thresh=0, options={"SymmetricMode": True}
+    )
+
+    ranks = initial(graph, start)
+    solution = ranks / (1 - damping_factor)
+    residuals = []
+    while True:
+        solution = lower.solve(right - upper @ solution)
+        new_ranks = solution / solution.sum()
+        residuals.append(np.abs(new_ranks - ranks).sum())
+        ranks = new_ranks
+        if residuals[-1] < threshold:
+            return ranks, residuals
+
+
+def aitken_iteration(graph, damping_factor, threshold=0.001, start=None):
+    """
+    Returns (ranks, residuals) like power_iteration, but tries the
+    Aitken delta-squared extrapolation of the last three iterates every
+    EXTRAPOLATE_EVERY iterations, see extrapolated.
+    """
+    return extrapolated(
+        graph, damping_factor, threshold, start, aitken_extrapolation, 3
+    )
+
+
+def quadratic_iteration(graph, damping_factor, threshold=0.001, start=None):
+    """
+    Returns (ranks, residuals) like power_iteration, but tries the
+    quadratic extrapolation of the last four iterates (Kamvar et al.,
+    2003) every EXTRAPOLATE_EVERY iterations, see extrapolated.
+    """
+    return extrapolated(
+        graph, damping_factor, threshold, start, quadratic_extrapolation, 4
+    )
+
+
+def adaptive_iteration(graph, damping_factor, threshold=0.001, start=None):
+    """
+    Returns (ranks, residuals) like power_iteration, but stops
+    recomputing pages once they converge: a page whose rank changed by
+    less than (1 - d) * threshold times its rank in two iterations in a
+    row is frozen, since the error left after a step is about 1 / (1 - d)
+    times its change. The rows of frozen pages are dropped from the
+    matrix once they make up REBUILD_FRACTION of those still active, and
+    residuals are the L1 change of active pages. When the active pages
+    converge, one full step checks every page; if the ranks still change
+    by threshold, all pages are thawed.
+    """
+    n = len(graph)
+    teleport = (1 - damping_factor) / n
+    ranks = initial(graph, start).copy()
+    active = np.arange(n)
+    rows = graph.matrix
+    calm = np.zeros(n, dtype=bool)
+    residuals = []
+    while True:
+        spread = ranks[graph.dangling].sum() / n
+        new_ranks = damping_factor * (rows @ ranks + spread) + teleport
+        changes = np.abs(new_ranks - ranks[active])
+        ranks[active] = new_ranks
+        residuals.append(changes.sum())
+
+        if residuals[-1] < threshold:
+            if active.size == n:
+                return ranks / ranks.sum(), residuals
+            active = np.arange(n)
+            rows = graph.matrix
+            calm = np.zeros(n, dtype=bool)
+            continue
+
+        now_calm = changes < (1 - damping_factor) * threshold * new_ranks
+        settled = calm & now_calm
+        calm = now_calm
+        if settled.sum() >= REBUILD_FRACTION * active.size:
+            active = active[~settled]
+            rows = graph.matrix[active]
+            calm = calm[~settled]
+
+
+# Solvers understood by solve, each called as
+# solver(graph, damping_factor, threshold, start)
+SOLVERS = {
+    "power": power_iteration,
+    "gauss-seidel": gauss_seidel,
+    "aitken": aitken_iteration,
+    "quadratic": quadratic_iteration,
+    "adaptive": adaptive_iteration,
+}
+
+# Power iterations between two extrapolation steps
+EXTRAPOLATE_EVERY = 10
+
+# Share of active pages that must settle before adaptive_iteration
+# freezes them and slices their rows out of the matrix
+REBUILD_FRACTION = 0.1
+
+# Largest share of nonzero teleport entries added one by one, rather
+# than as a whole matrix, by personalized_iteration
+SPARSE_JUMPS = 0.05
+
+
+def solve(graph, damping_factor, threshold=0.001, start=None,
+          method="power"):
+    """
+    Returns (ranks, residuals) for graph from the solver named by
+    method, one of SOLVERS.
+    """
+    if method not in SOLVERS:
+        raise ValueError(f"method must be one of {', '.join(SOLVERS)}")
+    return SOLVERS[method](graph, damping_factor, threshold, start)
+
+
+def personalized_iteration(graph, damping_factor, teleports,
+                           threshold=0.001):
+    """
+    Returns (ranks, residuals) for k personalized PageRank problems at
+    once, given an (N, k) matrix of teleport distributions. Column c of
+    ranks is the fixed point of
+
+        r' = (1 - d) * t + d * (matrix @ r + sum(r[dangling]) * t)
+
+    for t the column c of teleports, so the surfer restarts from t both
+    on teleporting and on dangling pages. Every iteration is a single
+    sparse matrix product with the columns still being solved; columns
+    are dropped once their L1 change is below threshold. residuals
+    lists the largest L1 change among them after every iteration.
+    """
+    teleports = np.asarray(teleports, float)
+    ranks = np.empty_like(teleports)
+    active = np.arange(teleports.shape[1])
+
+    # The columns still being solved, compacted as others finish
+    current = teleports.copy()
+    jumps = Jumps(teleports)
+    scratch = np.empty_like(current)
+    matrix = damping_factor * graph.matrix
+    residuals = []
+    while active.size:
+        spread = current[graph.dangling].sum(axis=0)
+        new_ranks = matrix @ current
+        jumps.add(new_ranks, damping_factor * spread + 1 - damping_factor,
+                  scratch)
+
+        np.subtract(new_ranks, current, out=scratch)
+        np.abs(scratch, out=scratch)
+        changes = scratch.sum(axis=0)
+        residuals.append(changes.max())
+        current = new_ranks
+
+        done = changes < threshold
+        if done.any():
+            ranks[:, active[done]] = current[:, done]
+            active = active[~done]
+            current = current[:, ~done]
+            jumps = jumps.keep(~done)
+            scratch = np.empty_like(current)
+    return ranks, residuals
+
+
+class Jumps():
+    """
+    Teleport distributions as an (N, k) matrix, also kept as a list of
+    nonzero entries when that is much shorter, as it is for topics of a
+    few pages each.
+    """
+
+    def __init__(self, matrix):
+        self.matrix = matrix
+        self.entries = None
+        if np.count_nonzero(matrix) <= SPARSE_JUMPS * matrix.size:
+            rows, columns = np.nonzero(matrix)
+            self.entries = (rows, columns, matrix[rows, columns])
+
+    def add(self, ranks, scale, scratch):
+        """Adds the teleport matrix times column scales to ranks."""
+        if self.entries is None:
+            np.multiply(self.matrix, scale, out=scratch)
+            ranks += scratch
+        else:
+            rows, columns, weights = self.entries
+            ranks[rows, columns] += weights * scale[columns]
+
+    def keep(self, columns):
+        """Returns the Jumps for the columns selected by a mask."""
+        return Jumps(self.matrix[:, columns])
+
+
+def initial(graph, start):
+    """Returns the starting rank vector, by default uniform."""
+    n = len(graph)
+    return np.full(n, 1 / n) if start is None else np.asarray(start, float)
+
+
+def step(graph, ranks, damping_factor):
+    """
+    Returns the ranks after one power iteration step, of a rank vector
+    or of each column of an (N, k) array.
+    """
+    n = len(graph)
+    spread = ranks[graph.dangling].sum(axis=0) / n
+    teleport = (1 - damping_factor) / n
+    return damping_factor * (graph.matrix @ ranks + spread) + teleport
+
+
+def extrapolated(graph, damping_factor, threshold, start, extrapolate,
+                 history):
+    """
+    Runs power iteration, extrapolating from the last `history`
+    iterates every EXTRAPOLATE_EVERY iterations. The step after an
+    extrapolation is taken both from it and from the iterate it was
+    made from, as one product with two columns, and the extrapolation
+    is kept only if its step changes the ranks less, so one that does
+    not help costs no extra iteration. After one is dropped, the next
+    waits twice as long.
+    """
+    ranks = initial(graph, start)
+    recent = [ranks]
+    residuals = []
+    every = EXTRAPOLATE_EVERY
+    due = every
+    candidate = None
+    while True:
+        if candidate is None:
+            new_ranks = step(graph, ranks, damping_factor)
+            residual = np.abs(new_ranks - ranks).sum()
+        else:
+            pair = np.column_stack((ranks, candidate))
+            stepped = step(graph, pair, damping_factor)
+            changes = np.abs(stepped - pair).sum(axis=0)
+            kept = int(changes[1] < changes[0])
+            if kept:
+                recent = [candidate]
+                every = EXTRAPOLATE_EVERY
+            else:
+                every *= 2
+            due = len(residuals) + every
+            new_ranks = np.ascontiguousarray(stepped[:, kept])
+            residual = changes[kept]
+            candidate = None
+        residuals.append(residual)
+        ranks = new_ranks
+        if residual < threshold:
+            return ranks, residuals
+
+        recent = (recent + [ranks])[-history:]
+        if len(residuals) >= due and len(recent) == history:
+            candidate = extrapolate(*recent)
+
+
+def aitken_extrapolation(first, second, third):
+    """
+    Returns the componentwise Aitken delta-squared extrapolation of
+    three successive rank vectors, normalized to sum to 1.
+    """
+    change = third - second
+    curvature = third - 2 * second + first
+    ranks = third.copy()
+    usable = np.abs(curvature) > 1e-300
+    ranks[usable] -= change[usable] ** 2 / curvature[usable]
+    return normalized(ranks, third)
+
+
+def quadratic_extrapolation(first, second, third, fourth):
+    """
+    Returns the quadratic extrapolation of four successive rank vectors
+    (Kamvar et al., 2003), normalized to sum to 1.
+    """
+    differences = np.column_stack((second - first, third - first))
+    last = fourth - first
+    (gamma1, gamma2), *_ = np.linalg.lstsq(differences, -last, rcond=None)
+    gamma3 = 1.0
+    ranks = (
+        (gamma1 + gamma2 + gamma3) * second
+        + (gamma2 + gamma3) * third
+        + gamma3 * fourth
+    )
+    return normalized(ranks, fourth)
+
+
+def normalized(ranks, fallback):
+    """
+    Returns ranks clipped to be non-negative and scaled to sum to 1, or
+    fallback if nothing is left.
+    """
+    ranks = np.maximum(ranks, 0)
+    total = ranks.sum()
+    return ranks / total if total > 0 else fallback
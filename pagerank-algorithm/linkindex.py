@@ -0,0 +1,209 @@
+"""
+Persistent link-graph index for incremental crawls of a corpus.
+
+The index records, for every page, the size and mtime of its file and
+every name its <a> tags link to, whether or not that name is a page
+yet, so a later crawl only parses files that were added or changed. It
+also keeps the last PageRank vector and the damping factor it was
+computed with, from which power iteration can warm-start.
+
+The index is stored as pagerank.index in the corpus directory: MAGIC, a
+little-endian uint32 format version and a uint32 header length, then a
+JSON header and the raw bytes of each array, aligned to 8 bytes. The
+header holds the name table: the pages in sorted order, followed by
+names that are only link targets. Page i has file size sizes[i] and
+mtime mtimes[i] (nanoseconds) and links to the names numbered
+targets[offsets[i]:offsets[i + 1]].
+"""
+
+import json
+import os
+import struct
+import time
+
+import numpy as np
+
+import crawler
+
+MAGIC = b"PRINDEX\0"
+VERSION = 1
+FILENAME = "pagerank.index"
+
+PREAMBLE = struct.Struct("<8sII")
+ALIGNMENT = 8
+
+# Arrays stored for each index, with their dtypes
+ARRAYS = (
+    ("sizes", "<i8"), ("mtimes", "<i8"),
+    ("offsets", "<i8"), ("targets", "<i4"), ("ranks", "<f8"),
+)
+
+
+class LinkIndex():
+    """
+    What an index knows about each page: entries maps page names to
+    (size, mtime, links) with links the set of every name linked to.
+    ranks maps pages to the PageRank computed with damping, or is None.
+    """
+
+    def __init__(self, entries, ranks=None, damping=None):
+        self.entries = entries
+        self.ranks = ranks
+        self.damping = damping
+
+    def corpus(self):
+        """Returns the crawl-style corpus dictionary of the index."""
+        pages = sorted(self.entries)
+        links = {page: self.entries[page][2] for page in pages}
+        return crawler.link_corpus(pages, links)
+
+    def start(self, damping_factor):
+        """
+        Returns the stored ranks to warm-start from, or None if there
+        are none for this damping factor.
+        """
+        if self.ranks is None or self.damping != damping_factor:
+            return None
+        return self.ranks
+
+
+def index_path(directory):
+    return os.path.join(directory, FILENAME)
+
+
+def update(directory, workers=None, index=None):
+    """
+    Brings the index of directory up to date with its pages, parsing
+    only the files whose size or mtime changed since `index`, or since
+    the stored index if none is given.
+
+    Returns (corpus, index, stats) as for crawler.crawl, where
+    stats["parsed"] counts the pages actually read. Stored ranks are
+    kept for pages that still exist.
+    """
+    start = time.perf_counter()
+    if index is None:
+        index = load(directory) or LinkIndex({})
+
+    entries = {}
+    changed = []
+    for page, stat in crawler.find_pages(directory, stats=True):
+        entry = index.entries.get(page)
+        if entry is not None and entry[:2] == (stat.st_size, stat.st_mtime_ns):
+            entries[page] = entry
+        else:
+            entries[page] = (stat.st_size, stat.st_mtime_ns, None)
+            changed.append(page)
+
+    for page, links in crawler.parse(directory, changed, workers):
+        size, mtime, _ = entries[page]
+        entries[page] = (size, mtime, links)
+
+    ranks = index.ranks
+    if ranks is not None:
+        ranks = {page: rank for page, rank in ranks.items() if page in entries}
+    index = LinkIndex(entries, ranks, index.damping)
+    corpus = index.corpus()
+    return corpus, index, crawler.crawl_stats(corpus, len(changed), start)
+
+
+def save(index, directory):
+    """
+    Writes index to directory under a temporary name and moves it into
+    place, so readers never see a partial index.
+    """
+    pages = sorted(index.entries)
+    names = {page: i for i, page in enumerate(pages)}
+    offsets = np.zeros(len(pages) + 1, dtype=np.int64)
+    targets = []
+    for i, page in enumerate(pages):
+        for link in sorted(index.entries[page][2]):
+            targets.append(names.setdefault(link, len(names)))
+        offsets[i + 1] = len(targets)
+
+    arrays = {
+        "sizes": [index.entries[page][0] for page in pages],
+        "mtimes": [index.entries[page][1] for page in pages],
+        "offsets": offsets,
+        "targets": targets,
+        "ranks": [] if index.ranks is None else [
+            index.ranks.get(page, 0.0) for page in pages
+        ],
+    }
+    header = {
+        "names": list(names),
+        "pages": len(pages),
+        "damping": index.damping if index.ranks is not None else None,
+        "sections": {},
+    }
+    layout = []
+    position = 0
+    for name, dtype in ARRAYS:
+        data = np.asarray(arrays[name], dtype=dtype)
+        position = aligned(position)
+        header["sections"][name] = [position, len(data)]
+        layout.append((position, data))
+        position += data.nbytes
+    header_bytes = json.dumps(header).encode("utf-8")
+    start = aligned(PREAMBLE.size + len(header_bytes))
+
+    path = index_path(directory)
+    temporary = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temporary, "wb") as f:
+            f.write(PREAMBLE.pack(MAGIC, VERSION, len(header_bytes)))
+            f.write(header_bytes)
+            for offset, data in layout:
+                f.write(bytes(start + offset - f.tell()))
+                f.write(data.tobytes())
+        os.replace(temporary, path)
+    finally:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+
+
+def load(directory):
+    """
+    Returns the LinkIndex stored in directory, or None if there is no
+    index or it is unreadable or from another format version.
+    """
+    try:
+        with open(index_path(directory), "rb") as f:
+            data = f.read()
+    except OSError:
+        return None
+
+    try:
+        magic, version, length = PREAMBLE.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            return None
+        header = json.loads(data[PREAMBLE.size:PREAMBLE.size + length])
+        start = aligned(PREAMBLE.size + length)
+        arrays = {}
+        for name, dtype in ARRAYS:
+            offset, count = header["sections"][name]
+            arrays[name] = np.frombuffer(
+                data, dtype=dtype, count=count, offset=start + offset
+            )
+        names = header["names"]
+        pages = names[:header["pages"]]
+    except (struct.error, ValueError, KeyError, TypeError):
+        return None
+
+    offsets = arrays["offsets"].tolist()
+    targets = arrays["targets"].tolist()
+    entries = {
+        page: (size, mtime, {names[t] for t in targets[a:b]})
+        for page, size, mtime, a, b in zip(
+            pages, arrays["sizes"].tolist(), arrays["mtimes"].tolist(),
+            offsets, offsets[1:]
+        )
+    }
+    ranks = None
+    if header["damping"] is not None:
+        ranks = dict(zip(pages, arrays["ranks"].tolist()))
+    return LinkIndex(entries, ranks, header["damping"])
+
+
+def aligned(position):
+    return -(-position // ALIGNMENT) * ALIGNMENT
@@ -1,51 +1,157 @@
-import os
-import random
-import re
+import argparse
 import sys
 
+import numpy as np
+
+import crawler
+import linkindex
+import sampling
+from linkgraph import SOLVERS, LinkGraph, personalized_iteration, solve
+from sampling import walk_counts
+
 DAMPING = 0.85
 SAMPLES = 10000
 
 
 def main():
-    if len(sys.argv) != 2:
-        sys.exit("Usage: python pagerank.py corpus")
-    corpus = crawl(sys.argv[1])
-    ranks = sample_pagerank(corpus, DAMPING, SAMPLES)
-    print(f"PageRank Results from Sampling (n = {SAMPLES})")
-    for page in sorted(ranks):
-        print(f"  {page}: {ranks[page]:.4f}")
-    ranks = iterate_pagerank(corpus, DAMPING)
+    parser = argparse.ArgumentParser(
+        description="Rank the pages of a corpus by PageRank."
+    )
+    parser.add_argument("corpus")
+    parser.add_argument(
+        "--samples", type=int, default=SAMPLES, metavar="N",
+        help=f"random surfer steps to sample (default: {SAMPLES})"
+    )
+    parser.add_argument(
+        "--walkers", type=int, metavar="N",
+        help="split the sample between N independent walkers in parallel "
+             "and report confidence intervals"
+    )
+    parser.add_argument(
+        "--workers", type=int,
+        help="worker processes for crawling and --walkers "
+             "(default: one per CPU)"
+    )
+    parser.add_argument(
+        "--seed", type=int, help="seed for a reproducible sample"
+    )
+    parser.add_argument(
+        "--solver", choices=SOLVERS, default="power",
+        help="method used to iterate PageRank (default: power)"
+    )
+    parser.add_argument(
+        "--topic", action="append", default=[], metavar="NAME=PAGES",
+        help="also rank pages for a topic, teleporting only to the "
+             "comma-separated PAGES (repeatable)"
+    )
+    parser.add_argument(
+        "--no-cache", dest="cache", action="store_false",
+        help="parse every page and skip the link index and warm start"
+    )
+    args = parser.parse_args()
+    if args.walkers is not None and args.walkers < 2:
+        parser.error("--walkers must be at least 2 for confidence intervals")
+    if args.cache:
+        corpus, index, stats = linkindex.update(args.corpus, args.workers)
+    else:
+        corpus, stats = crawler.crawl(args.corpus, args.workers)
+        index = None
+    print(
+        f"Crawled {stats['pages']} pages and {stats['links']} links in "
+        f"{stats['seconds']:.2f}s ({stats['pages_per_second']:.0f} pages/sec, "
+        f"{stats['parsed']} parsed)",
+        file=sys.stderr
+    )
+
+    if args.walkers is not None:
+        ranks, errors = parallel_sample_pagerank(
+            corpus, DAMPING, args.samples, args.walkers, args.workers,
+            args.seed
+        )
+        print(
+            f"PageRank Results from Sampling "
+            f"(n = {args.samples}, {args.walkers} walkers, 95% intervals)"
+        )
+        for page in sorted(ranks):
+            print(f"  {page}: {ranks[page]:.4f} +/- {errors[page]:.4f}")
+    else:
+        ranks = sample_pagerank(corpus, DAMPING, args.samples, args.seed)
+        print(f"PageRank Results from Sampling (n = {args.samples})")
+        for page in sorted(ranks):
+            print(f"  {page}: {ranks[page]:.4f}")
+
+    sampled = ranks
+    start = index.start(DAMPING) if index is not None else None
+    ranks, residuals = solve_pagerank(
+        corpus, DAMPING, start=start, method=args.solver
+    )
+    print(
+        f"Iterated with {args.solver} in {len(residuals)} iterations "
+        f"(final L1 change {residuals[-1]:.2e})",
+        file=sys.stderr
+    )
     print(f"PageRank Results from Iteration")
     for page in sorted(ranks):
         print(f"  {page}: {ranks[page]:.4f}")
 
+    if index is not None:
+        index.ranks = ranks
+        index.damping = DAMPING
+        save_index(index, args.corpus)
+
+    if args.topic:
+        topics = {}
+        for topic in args.topic:
+            name, _, pages = topic.partition("=")
+            topics[name] = [page for page in pages.split(",") if page]
+        try:
+            results = topic_pagerank(corpus, DAMPING, topics)
+        except ValueError:
+            sys.exit("Each --topic must name pages in the corpus.")
+        for name, topic_ranks in results.items():
+            print(f"PageRank Results for Topic {name}")
+            for page in sorted(topic_ranks):
+                print(f"  {page}: {topic_ranks[page]:.4f}")
+
+    if args.walkers is not None:
+        report = compare_ranks(sampled, errors, ranks)
+        print(
+            f"Sampling vs iteration: max error {report['max_error']:.4f}, "
+            f"L1 error {report['l1_error']:.4f}, "
+            f"{report['coverage']:.0%} of pages within their interval"
+        )
+
 
-def crawl(directory):
+def crawl(directory, workers=None, cache=False):
     """
     Parse a directory of HTML pages and check for links to other pages.
     Return a dictionary where each key is a page, and values are
     a list of all other pages in the corpus that are linked to by the page.
+
+    Pages in subdirectories are named by their relative path, such as
+    "topics/search.html", and are parsed across `workers` processes.
+    With `cache`, a link index is kept in the directory so that only
+    pages changed since the last crawl are parsed again.
     """
-    pages = dict()
+    if cache:
+        pages, index, _ = linkindex.update(directory, workers)
+        save_index(index, directory)
+        return pages
 
-    # Extract all links from HTML files
-    for filename in os.listdir(directory):
-        if not filename.endswith(".html"):
-            continue
-        with open(os.path.join(directory, filename)) as f:
-            contents = f.read()
-            links = re.findall(r"<a\s+(?:[^>]*?)href=\"([^\"]*)\"", contents)
-            pages[filename] = set(links) - {filename}
+    # Stream pages through an HTML tokenizer in parallel, see crawler.py
+    pages, _ = crawler.crawl(directory, workers)
+    return pages
 
-    # Only include links to other pages in the corpus
-    for filename in pages:
-        pages[filename] = set(link for link in pages[filename] if link in pages)
 
-    return pages
+def save_index(index, directory):
+    try:
+        linkindex.save(index, directory)
+    except OSError:
+        # A read-only corpus just means no index
+        pass
 
 
-def transition_model(corpus, page, damping_factor):
+def transition_model(corpus, page, damping_factor, teleport=None):
     """
     Return a probability distribution over which page to visit next,
     given a current page.
@@ -53,7 +159,25 @@ def transition_model(corpus, page, damping_factor):
     With probability damping_factor, choose a link at random
     linked to by page. With probability 1 - damping_factor, choose
     a link at random chosen from all pages in the corpus.
+
+    `teleport` optionally maps pages to the probabilities of jumping to
+    them instead, for personalized PageRank; pages without links then
+    lead to a page chosen from it as well.
     """
+    if teleport is not None:
+        total = sum(teleport.values())
+        linked = corpus[page]
+        PR = {}
+        for i in corpus:
+            jump = teleport.get(i, 0) / total
+            if not linked:
+                PR[i] = jump
+            else:
+                PR[i] = (1 - damping_factor) * jump
+                if i in linked:
+                    PR[i] += damping_factor / len(linked)
+        return PR
+
     # corpus is your dictionary from crawl with keys of pages and links
     pages = set(corpus.keys())
     linked = corpus[page]
@@ -77,7 +201,7 @@ def transition_model(corpus, page, damping_factor):
     return PR
 
 
-def sample_pagerank(corpus, damping_factor, n):
+def sample_pagerank(corpus, damping_factor, n, seed=None):
     """
     Return PageRank values for each page by sampling `n` pages
     according to transition model, starting with a page at random.
@@ -85,64 +209,127 @@ def sample_pagerank(corpus, damping_factor, n):
     Return a dictionary where keys are page names, and values are
     their estimated PageRank value (a value between 0 and 1). All
     PageRank values should sum to 1.
+
+    `seed` makes the sample reproducible.
     """
+    # Walk the link arrays directly instead of calling transition_model
+    # at every step, see sampling.py
+    graph = LinkGraph.from_corpus(corpus)
+    count = walk_counts(graph, damping_factor, n, np.random.default_rng(seed))
 
-    # just as in above - make a list from corpus at random
-    page = random.choice(list(corpus.keys()))
-    count = {p: 0 for p in corpus}
+    # Converts counts to PageRank values
+    return graph.ranks(count / n)
 
-    # Count the page visits
-    for _ in range(n):
-        count[page] += 1
 
-        # Probability for next pages
-        pr = transition_model(corpus, page, damping_factor)
+def parallel_sample_pagerank(corpus, damping_factor, n,
+                             walkers=sampling.WALKERS, workers=None,
+                             seed=None):
+    """
+    Estimate PageRank like sample_pagerank, but with the `n` samples
+    split between independent walkers run across `workers` processes
+    (default one per CPU).
 
-        # Randomly choose next page based on probabilities
-        pages = list(pr.keys())
-        weights = list(pr.values())
-        page = random.choices(pages, weights=weights, k=1)[0]
+    Return (ranks, errors): dictionaries mapping each page to its
+    estimated PageRank value and to the half-width of a 95% confidence
+    interval around it, estimated from the spread between walkers.
 
-    # Converts counts to PageRank values
-    rank = {p: count[p] / n for p in count}
+    Raises ValueError if fewer than 2 walkers share the samples.
+    """
+    if min(walkers, n) < 2:
+        raise ValueError("confidence intervals need at least 2 walkers")
+    graph = LinkGraph.from_corpus(corpus)
+    counts = sampling.parallel_walk_counts(
+        graph, damping_factor, n, walkers, workers, seed
+    )
+    ranks, errors = sampling.estimate(counts)
+    return graph.ranks(ranks), graph.ranks(errors)
 
-    return rank
 
+def compare_ranks(sampled, errors, exact):
+    """
+    Compare sampled PageRank values and their interval half-widths
+    against exact ones, such as from iterate_pagerank.
 
-def iterate_pagerank(corpus, damping_factor, threshold=0.001):
+    Return a dictionary of the max_error and l1_error of the samples,
+    and the coverage: the fraction of pages whose exact value lies
+    within its interval.
+    """
+    gaps = {page: abs(sampled[page] - exact[page]) for page in exact}
+    covered = sum(gaps[page] <= errors[page] for page in exact)
+    return {
+        "max_error": max(gaps.values(), default=0.0),
+        "l1_error": sum(gaps.values()),
+        "coverage": covered / len(exact) if exact else 1.0,
+    }
+
+
+def iterate_pagerank(corpus, damping_factor, threshold=0.001, start=None,
+                     method="power"):
     """
     Compute PageRank values for each page by repeatedly updating
-    until values converge (less than threshold change).
-    """
-    N = len(corpus)
-    pagerank = {page: 1 / N for page in corpus}
-
-    # Loop until ranks converge
-    while True:
-        new_ranks = {}
-        for page in corpus:
-            total = 0
-            for possible_page in corpus:
-                links = corpus[possible_page]
-                if not links:
-                    total += pagerank[possible_page] / N
-                elif page in links:
-                    total += pagerank[possible_page] / len(links)
-
-            # PageRank 
-            new_ranks[page] = (1 - damping_factor) / N + damping_factor * total
-
-        # Convergence
-        converged = all(
-            abs(new_ranks[page] - pagerank[page]) < threshold
-            for page in corpus
-        )
-        pagerank = new_ranks
+    until values converge (L1 change in the ranks less than threshold).
+
+    `start` optionally maps pages to earlier PageRank values, such as
+    from before an edit to the corpus, to start updating from. `method`
+    names the solver, one of linkgraph.SOLVERS.
+    """
+    ranks, _ = solve_pagerank(corpus, damping_factor, threshold, start,
+                              method)
+    return ranks
+
+
+def personalized_pagerank(corpus, damping_factor, teleports,
+                          threshold=0.001):
+    """
+    Compute personalized PageRank values, where the random surfer
+    teleports (and leaves pages without links) to a page chosen from a
+    teleport distribution rather than uniformly.
+
+    `teleports` maps pages to weights, or is a list of such
+    dictionaries; all of them are solved together, with one sparse
+    matrix product per iteration. Return a dictionary of PageRank
+    values for each page, or a list of them in the same order.
+    """
+    many = not isinstance(teleports, dict)
+    distributions = list(teleports) if many else [teleports]
+    graph = LinkGraph.from_corpus(corpus)
+    ranks, _ = personalized_iteration(
+        graph, damping_factor, graph.teleports(distributions), threshold
+    )
+    results = [graph.ranks(ranks[:, column]) for column in range(ranks.shape[1])]
+    return results if many else results[0]
+
 
-        if converged:
-            break
+def topic_pagerank(corpus, damping_factor, topics, threshold=0.001):
+    """
+    Compute topic-sensitive PageRank values: `topics` maps each topic
+    name to the pages about it, and the surfer of that topic teleports
+    uniformly among them.
+
+    Return a dictionary mapping each topic to its PageRank values.
+    """
+    teleports = [dict.fromkeys(pages, 1) for pages in topics.values()]
+    results = personalized_pagerank(
+        corpus, damping_factor, teleports, threshold
+    )
+    return dict(zip(topics, results))
 
-    return pagerank
+
+def solve_pagerank(corpus, damping_factor, threshold=0.001, start=None,
+                   method="power"):
+    """
+    Compute PageRank values like iterate_pagerank.
+
+    Return (ranks, residuals), where residuals lists the L1 change in
+    the ranks after each iteration, so its length is the number of
+    iterations the solver took.
+    """
+    # Iterate over the sparse link matrix, see linkgraph.py
+    graph = LinkGraph.from_corpus(corpus)
+    if start is not None:
+        start = graph.vector(start)
+    ranks, residuals = solve(graph, damping_factor, threshold, start, method)
+    return graph.ranks(ranks), residuals
 
 
 if __name__ == "__main__":
@@ -0,0 +1,141 @@
+"""
+Vectorized random-surfer sampling for sample_pagerank.
+
+The surfer of transition_model restarts at a uniformly random page
+whenever it teleports (probability 1 - damping) or lands on a page
+without links, so its walk is a sequence of independent segments: each
+starts at a uniform page and follows uniformly chosen links until the
+next restart. Many segments are therefore simulated at once with NumPy,
+one array operation per step of depth, and laid end to end; the visit
+counts have exactly the distribution of a single n-step walk.
+
+parallel_walk_counts runs several independent walkers across a process
+pool. Walker k draws from its own stream, spawned from the seed as
+numpy.random.SeedSequence(seed).spawn(walkers)[k], so results depend on
+the seed and number of walkers but not on the number of processes. The
+spread of the walkers' estimates gives a standard error for each page.
+"""
+
+import multiprocessing
+import os
+
+import numpy as np
+import scipy.stats
+
+# Segments simulated together, which bounds the memory of one block
+BLOCK_SEGMENTS = 200_000
+
+# Independent walkers used when no count is given
+WALKERS = 16
+
+# Confidence level of the intervals from estimate
+CONFIDENCE = 0.95
+
+# Graph walked by this worker process, set by init_worker
+graph = None
+
+
+def walk_counts(graph, damping_factor, n, rng):
+    """
+    Returns an array with the number of visits to each page of a
+    LinkGraph during an n-step random surfer walk, drawing from the
+    NumPy Generator `rng`.
+    """
+    size = len(graph)
+    degrees = np.diff(graph.offsets)
+    counts = np.zeros(size, dtype=np.int64)
+    remaining = n
+
+    while remaining > 0:
+        # Each segment is at least one visit, and lasts 1 / (1 - d) on
+        # average, so this many usually covers the remaining steps
+        segments = int(remaining * (1 - damping_factor)) + 1
+        segments = min(segments, BLOCK_SEGMENTS, remaining)
+
+        lengths = np.zeros(segments, dtype=np.int64)
+        visits = []
+        active = np.arange(segments)
+        pages = rng.integers(size, size=segments)
+        depth = 0
+        while active.size and depth < remaining:
+            visits.append((active, depth, pages))
+            lengths[active] += 1
+
+            # Follow a link with probability d, unless there are none
+            page_degrees = degrees[pages]
+            follow = page_degrees > 0
+            follow &= rng.random(pages.size) < damping_factor
+            active = active[follow]
+            pages = pages[follow]
+            page_degrees = page_degrees[follow]
+            choice = (rng.random(pages.size) * page_degrees).astype(np.int64)
+            pages = graph.links[graph.offsets[pages] + choice]
+            depth += 1
+
+        # Lay the segments end to end and keep the first `remaining` visits
+        starts = np.cumsum(lengths) - lengths
+        for active, depth, pages in visits:
+            kept = pages[starts[active] + depth < remaining]
+            counts += np.bincount(kept, minlength=size)
+        remaining -= min(int(lengths.sum()), remaining)
+
+    return counts
+
+
+def parallel_walk_counts(link_graph, damping_factor, n, walkers=WALKERS,
+                         workers=None, seed=None):
+    """
+    Splits an n-step sample between independent walkers run across
+    `workers` processes (default one per CPU). Returns a (walkers,
+    pages) array holding each walker's visit counts; each row sums to
+    that walker's share of n.
+    """
+    walkers = max(1, min(walkers, n))
+    workers = min(workers or os.cpu_count() or 1, walkers)
+    streams = np.random.SeedSequence(seed).spawn(walkers)
+    tasks = [
+        (damping_factor, n // walkers + (k < n % walkers), stream)
+        for k, stream in enumerate(streams)
+    ]
+
+    if workers == 1:
+        init_worker(link_graph)
+        return np.array(list(map(walker_counts, tasks)))
+    with multiprocessing.Pool(
+        workers, initializer=init_worker, initargs=(link_graph,)
+    ) as pool:
+        return np.array(pool.map(walker_counts, tasks))
+
+
+def init_worker(link_graph):
+    """Prepares a worker process to run walkers over link_graph."""
+    global graph
+    graph = link_graph
+
+
+def walker_counts(task):
+    """Returns the visit counts of one (damping, steps, seed) walker."""
+    damping_factor, steps, stream = task
+    rng = np.random.default_rng(stream)
+    return walk_counts(graph, damping_factor, steps, rng)
+
+
+def estimate(counts):
+    """
+    Returns (ranks, errors) from a (walkers, pages) array of visit
+    counts: the pooled visit frequency of each page, and the half-width
+    of its 95% confidence interval. The standard error is taken from the
+    spread of the walkers' own frequencies (batch means), with a Student
+    t quantile as it is estimated from only one value per walker.
+
+    Raises ValueError with fewer than 2 walkers, which have no spread.
+    """
+    walkers = len(counts)
+    if walkers < 2:
+        raise ValueError("confidence intervals need at least 2 walkers")
+    steps = counts.sum(axis=1)
+    ranks = counts.sum(axis=0) / steps.sum()
+    frequencies = counts / steps[:, None]
+    spread = frequencies.std(axis=0, ddof=1)
+    quantile = scipy.stats.t.ppf((1 + CONFIDENCE) / 2, walkers - 1)
+    return ranks, quantile * spread / np.sqrt(walkers)
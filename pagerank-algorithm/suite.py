@@ -0,0 +1,129 @@
+"""
+Scale benchmark for pagerank.py on synthetic corpora (see generate.py).
+
+For each corpus size, generates (or reuses) a corpus under the root
+directory and times crawling it, building its link graph, sampling
+PageRank and iterating PageRank. Results are written as one JSON object
+per line, for tracking regressions across commits and machines:
+    {"pages": 1000, "links": 1777, "dangling": 109,
+     "crawl_seconds": 0.05, "pages_per_second": 20000.0, ...}
+Progress is printed to stderr.
+
+Usage: python suite.py [--sizes N ...] [--root DIR] [--samples N]
+                       [--workers N] [--output FILE]
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+import numpy as np
+import scipy
+
+import crawler
+import generate
+from linkgraph import LinkGraph, power_iteration
+from sampling import walk_counts
+
+SIZES = (1_000, 100_000, 1_000_000)
+SAMPLES = 1_000_000
+DAMPING = 0.85
+THRESHOLD = 0.001
+
+ROOT = os.path.join(tempfile.gettempdir(), "pagerank-corpora")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Time pagerank.py on synthetic corpora."
+    )
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=SIZES, metavar="N",
+        help="corpus sizes in pages (default: 1k, 100k and 1M)"
+    )
+    parser.add_argument(
+        "--root", default=ROOT,
+        help=f"directory holding the generated corpora (default: {ROOT})"
+    )
+    parser.add_argument(
+        "--samples", type=int, default=SAMPLES, metavar="N",
+        help=f"random surfer steps to sample (default: {SAMPLES})"
+    )
+    parser.add_argument(
+        "--workers", type=int,
+        help="worker processes for crawling (default: one per CPU)"
+    )
+    parser.add_argument(
+        "--output", metavar="FILE",
+        help="append results to FILE instead of printing them"
+    )
+    args = parser.parse_args()
+
+    output = open(args.output, "a") if args.output else sys.stdout
+    try:
+        for pages in args.sizes:
+            result = run(pages, args.root, args.samples, args.workers)
+            output.write(json.dumps(result) + "\n")
+            output.flush()
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+
+def run(pages, root=ROOT, samples=SAMPLES, workers=None):
+    """Generates a corpus of `pages` pages and returns its timings."""
+    directory = os.path.join(root, str(pages))
+    print(f"Generating {pages} pages in {directory}...", file=sys.stderr)
+    start = time.perf_counter()
+    manifest = generate.generate(directory, pages)
+    generate_seconds = time.perf_counter() - start
+
+    print(f"Crawling {pages} pages...", file=sys.stderr)
+    corpus, stats = crawler.crawl(directory, workers)
+    if len(corpus) != pages or stats["links"] != manifest["links"]:
+        raise Exception(f"crawl of {directory} does not match its manifest")
+
+    start = time.perf_counter()
+    graph = LinkGraph.from_corpus(corpus)
+    graph_seconds = time.perf_counter() - start
+    del corpus
+
+    print(f"Sampling and iterating {pages} pages...", file=sys.stderr)
+    start = time.perf_counter()
+    walk_counts(graph, DAMPING, samples, np.random.default_rng(0))
+    sample_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    _, residuals = power_iteration(graph, DAMPING, THRESHOLD)
+    iterate_seconds = time.perf_counter() - start
+
+    return {
+        "pages": pages,
+        "links": manifest["links"],
+        "dangling": manifest["dangling"],
+        "generate_seconds": generate_seconds,
+        "crawl_seconds": stats["seconds"],
+        "pages_per_second": stats["pages_per_second"],
+        "graph_seconds": graph_seconds,
+        "samples": samples,
+        "sample_seconds": sample_seconds,
+        "samples_per_second": samples / sample_seconds,
+        "iterations": len(residuals),
+        "iterate_seconds": iterate_seconds,
+        "damping": DAMPING,
+        "threshold": THRESHOLD,
+        "workers": workers or os.cpu_count(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "scipy": scipy.__version__,
+        "machine": platform.machine(),
+        "timestamp": time.time(),
+    }
+
+
+if __name__ == "__main__":
+    main()
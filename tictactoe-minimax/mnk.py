@@ -0,0 +1,267 @@
+"""
+Alpha-beta search for m,n,k-games, played by tictactoe.alphabeta.
+
+Two players take turns placing a stone on an empty cell of an m by n
+board, and the first to get k stones in a row, across, down or
+diagonally, wins: tic-tac-toe is the 3,3,3-game and gomoku the
+15,15,5-game. A position is two bitboards, one per player, where bit
+i * n + j is cell (i, j), and every line of k cells a player could
+complete is a "window" mask.
+
+The search is negamax with alpha-beta pruning and a transposition
+table, deepened one ply at a time until a time budget runs out:
+
+- Moves are ordered with a winning move first, then moves that block
+  the opponent's win (the only moves worth searching when there are
+  any), then the best move of the last search of the position, then by
+  how much they raise the static evaluation.
+- The static evaluation scores each window only one player has stones
+  in, by how many they have there, and is updated from the windows
+  through each move instead of recomputed.
+- On large boards, only cells near a stone are tried.
+
+A win scores more than any evaluation, less the plies to reach it, so
+a quicker win is preferred and a loss is put off.
+"""
+
+import collections
+import time
+
+# Boards of more cells than this only try moves NEIGHBOURHOOD cells away
+# from a stone, in any direction
+SMALL_BOARD = 25
+NEIGHBOURHOOD = 1
+
+# Nodes searched between checks of the clock
+CLOCK_NODES = 1024
+
+# Transposition table bounds
+EXACT, LOWER, UPPER = range(3)
+
+Result = collections.namedtuple(
+    "Result", ["move", "score", "depth", "nodes", "seconds"]
+)
+
+
+class Timeout(Exception):
+    pass
+
+
+class Game():
+
+    def __init__(self, m, n, k):
+        if m < 1 or n < 1 or not 1 <= k <= max(m, n):
+            raise ValueError(f"no {m},{n},{k}-game")
+        self.m = m
+        self.n = n
+        self.k = k
+        self.cells = m * n
+        self.full = (1 << self.cells) - 1
+
+        windows = []
+        for di, dj in ((0, 1), (1, 0), (1, 1), (1, -1)):
+            for i in range(m):
+                for j in range(n):
+                    if (0 <= i + di * (k - 1) < m
+                            and 0 <= j + dj * (k - 1) < n):
+                        windows.append(sum(
+                            1 << ((i + di * s) * n + j + dj * s)
+                            for s in range(k)
+                        ))
+        self.windows = list(dict.fromkeys(windows))
+        self.through = [
+            [window for window in self.windows if window >> cell & 1]
+            for cell in range(self.cells)
+        ]
+        self.near = [
+            sum(
+                1 << (i * n + j)
+                for i in range(max(0, cell // n - NEIGHBOURHOOD),
+                               min(m, cell // n + NEIGHBOURHOOD + 1))
+                for j in range(max(0, cell % n - NEIGHBOURHOOD),
+                               min(n, cell % n + NEIGHBOURHOOD + 1))
+            )
+            for cell in range(self.cells)
+        ]
+
+        # Score of a window by the stones in it, and for a win, more
+        # than any evaluation can reach
+        self.weights = [0] + [10 ** i for i in range(k)]
+        self.win = 10 * (len(self.windows) + 1) * self.weights[k]
+
+    def won(self, stones):
+        """Checks if stones hold a whole window."""
+        return any(window & stones == window for window in self.windows)
+
+    def evaluate(self, me, them):
+        """
+        Returns the static evaluation of a position for the player with
+        stones me, whose opponent has stones them.
+        """
+        score = 0
+        for window in self.windows:
+            if not window & them:
+                score += self.weights[(window & me).bit_count()]
+            elif not window & me:
+                score -= self.weights[(window & them).bit_count()]
+        return score
+
+    def search(self, me, them, budget=None, depth=None):
+        """
+        Returns a Result for the player with stones me to move, whose
+        opponent has stones them: the best move found, as a cell
+        number, its score, the depth searched, the nodes visited and
+        the seconds taken.
+
+        Searches one ply deeper at a time until depth, or the end of the
+        game, or until budget seconds have passed (but always to depth
+        1), keeping the result of the deepest search that finished.
+        """
+        start = time.perf_counter()
+        self.nodes = 0
+        self.table = {}
+        remaining = (self.full & ~(me | them)).bit_count()
+        if not remaining:
+            raise ValueError("board is full")
+        score = self.evaluate(me, them)
+
+        result = None
+        self.deadline = float("inf")
+        for limit in range(1, min(depth or remaining, remaining) + 1):
+            try:
+                value = self.negamax(me, them, score, limit, -self.win,
+                                     self.win, 0)
+            except Timeout:
+                break
+            move = self.table[me, them][3]
+            result = Result(move, value, limit, self.nodes,
+                            time.perf_counter() - start)
+            if abs(value) > self.win - self.cells:
+                break
+            if budget is not None:
+                self.deadline = start + budget
+                if time.perf_counter() > self.deadline:
+                    break
+        return result._replace(nodes=self.nodes,
+                               seconds=time.perf_counter() - start)
+
+    def negamax(self, me, them, score, depth, alpha, beta, ply):
+        """
+        Returns the value of a position for the player with stones me to
+        move, searched depth plies deep, or a bound on it outside the
+        window (alpha, beta). score is its static evaluation.
+        """
+        self.nodes += 1
+        if (not self.nodes % CLOCK_NODES
+                and time.perf_counter() > self.deadline):
+            raise Timeout
+        if me | them == self.full:
+            return 0
+        if depth == 0:
+            return score
+
+        key = (me, them)
+        entry = self.table.get(key)
+        best_move = None
+        if entry is not None:
+            entry_depth, value, bound, best_move = entry
+            value = self.from_table(value, ply)
+            if entry_depth >= depth and (
+                bound == EXACT
+                or bound == LOWER and value >= beta
+                or bound == UPPER and value <= alpha
+            ):
+                return value
+
+        moves = self.ordered(me, them, best_move)
+        cell, _, winning = moves[0]
+        if winning:
+            self.table[key] = (self.cells,
+                               self.to_table(self.win - ply - 1, ply),
+                               EXACT, cell)
+            return self.win - ply - 1
+
+        original = alpha
+        best = -self.win - 1
+        for cell, delta, _ in moves:
+            value = -self.negamax(them, me | 1 << cell, -(score + delta),
+                                  depth - 1, -beta, -alpha, ply + 1)
+            if value > best:
+                best, best_move = value, cell
+                alpha = max(alpha, value)
+                if alpha >= beta:
+                    break
+
+        bound = (UPPER if best <= original
+                 else LOWER if best >= beta else EXACT)
+        self.table[key] = (depth, self.to_table(best, ply), bound, best_move)
+        return best
+
+    def ordered(self, me, them, best_move):
+        """
+        Returns the moves to search for the player with stones me, as
+        (cell, delta, winning) in the order to search them, where delta
+        is the change the move makes to the static evaluation: a
+        winning move if there is one, else the moves that block an
+        opponent's win if there are any, else every candidate move.
+        """
+        occupied = me | them
+        empty = self.full & ~occupied
+        candidates = empty
+        if self.cells > SMALL_BOARD:
+            if not occupied:
+                return [((self.m // 2) * self.n + self.n // 2, 0, False)]
+            near = 0
+            stones = occupied
+            while stones:
+                low = stones & -stones
+                near |= self.near[low.bit_length() - 1]
+                stones ^= low
+            candidates = near & empty or empty
+
+        k = self.k
+        weights = self.weights
+        moves = []
+        blocking = []
+        while candidates:
+            low = candidates & -candidates
+            candidates ^= low
+            cell = low.bit_length() - 1
+            delta = 0
+            blocks = False
+            for window in self.through[cell]:
+                theirs = window & them
+                if not theirs:
+                    mine = (window & me).bit_count()
+                    if mine == k - 1:
+                        return [(cell, delta, True)]
+                    delta += weights[mine + 1] - weights[mine]
+                elif not window & me:
+                    theirs = theirs.bit_count()
+                    blocks = blocks or theirs == k - 1
+                    delta += weights[theirs]
+            if blocks:
+                blocking.append((cell, delta, False))
+            moves.append((cell, delta, False))
+
+        if blocking:
+            moves = blocking
+        moves.sort(key=lambda move: (move[0] == best_move, move[1]),
+                   reverse=True)
+        return moves
+
+    def to_table(self, value, ply):
+        """Makes a win or loss score count plies from this position."""
+        if value > self.win - self.cells:
+            return value + ply
+        if value < self.cells - self.win:
+            return value - ply
+        return value
+
+    def from_table(self, value, ply):
+        """Makes a win or loss score from the table count from the root."""
+        if value > self.win - self.cells:
+            return value - ply
+        if value < self.cells - self.win:
+            return value + ply
+        return value
@@ -1,9 +1,36 @@
+import argparse
 import pygame
 import sys
 import time
 
 import tictactoe as ttt
 
+parser = argparse.ArgumentParser(
+    description="Play tic-tac-toe, or another m,n,k-game, against the AI."
+)
+parser.add_argument(
+    "--size", type=int, nargs=2, default=(3, 3), metavar=("ROWS", "COLUMNS"),
+    help="board size (default: 3 3)"
+)
+parser.add_argument(
+    "-k", type=int,
+    help=f"stones in a row to win (default: shorter side, up to {ttt.MAX_K})"
+)
+parser.add_argument(
+    "--engine", choices=("minimax", "alphabeta"),
+    help="AI search (default: minimax on 3x3 boards, alphabeta otherwise)"
+)
+parser.add_argument(
+    "--budget", type=float, default=ttt.BUDGET, metavar="SECONDS",
+    help=f"seconds alphabeta searches per move (default: {ttt.BUDGET})"
+)
+args = parser.parse_args()
+rows, columns = args.size
+tic_tac_toe = (rows, columns) == (3, 3) and args.k in (None, 3)
+engine = args.engine or ("minimax" if tic_tac_toe else "alphabeta")
+if engine == "minimax" and not tic_tac_toe:
+    parser.error("minimax only plays 3x3 boards with 3 in a row")
+
 pygame.init()
 size = width, height = 600, 400
 
@@ -15,10 +42,11 @@ screen = pygame.display.set_mode(size)
 
 mediumFont = pygame.font.Font("OpenSans-Regular.ttf", 28)
 largeFont = pygame.font.Font("OpenSans-Regular.ttf", 40)
-moveFont = pygame.font.Font("OpenSans-Regular.ttf", 60)
+tile_size = min(80, (height - 100) // rows, (width - 40) // columns)
+moveFont = pygame.font.Font("OpenSans-Regular.ttf", tile_size * 3 // 4)
 
 user = None
-board = ttt.initial_state()
+board = ttt.initial_state(rows, columns)
 ai_turn = False
 
 while True:
@@ -67,13 +95,12 @@ while True:
     else:
 
         # Draw game board
-        tile_size = 80
-        tile_origin = (width / 2 - (1.5 * tile_size),
-                       height / 2 - (1.5 * tile_size))
+        tile_origin = (width / 2 - (columns / 2 * tile_size),
+                       height / 2 - (rows / 2 * tile_size))
         tiles = []
-        for i in range(3):
+        for i in range(rows):
             row = []
-            for j in range(3):
+            for j in range(columns):
                 rect = pygame.Rect(
                     tile_origin[0] + j * tile_size,
                     tile_origin[1] + i * tile_size,
@@ -89,12 +116,12 @@ while True:
                 row.append(rect)
             tiles.append(row)
 
-        game_over = ttt.terminal(board)
+        game_over = ttt.terminal(board, args.k)
         player = ttt.player(board)
 
         # Show title
         if game_over:
-            winner = ttt.winner(board)
+            winner = ttt.winner(board, args.k)
             if winner is None:
                 title = f"Game Over: Tie."
             else:
@@ -112,7 +139,13 @@ while True:
         if user != player and not game_over:
             if ai_turn:
                 time.sleep(0.5)
-                move = ttt.minimax(board)
+                if engine == "minimax":
+                    move = ttt.minimax(board)
+                else:
+                    found = ttt.search(board, args.k, args.budget)
+                    move = found.move
+                    print(f"{found.nodes} nodes to depth {found.depth} "
+                          f"in {found.seconds:.2f}s, score {found.score}")
                 board = ttt.result(board, move)
                 ai_turn = False
             else:
@@ -122,8 +155,8 @@ while True:
         click, _, _ = pygame.mouse.get_pressed()
         if click == 1 and user == player and not game_over:
             mouse = pygame.mouse.get_pos()
-            for i in range(3):
-                for j in range(3):
+            for i in range(rows):
+                for j in range(columns):
                     if (board[i][j] == ttt.EMPTY and tiles[i][j].collidepoint(mouse)):
                         board = ttt.result(board, (i, j))
 
@@ -140,7 +173,7 @@ while True:
                 if againButton.collidepoint(mouse):
                     time.sleep(0.2)
                     user = None
-                    board = ttt.initial_state()
+                    board = ttt.initial_state(rows, columns)
                     ai_turn = False
 
     pygame.display.flip()
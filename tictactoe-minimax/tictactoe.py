@@ -2,18 +2,79 @@
 Tic Tac Toe Player
 """
 
+import functools
 import math
 
+import mnk
+
 X = "X"
 O = "O"
 EMPTY = None
 
+# Longest line needed to win by default, as in gomoku
+MAX_K = 5
+
+# Seconds alphabeta searches for by default
+BUDGET = 1.0
+
+# Bitboards: bit n * i + j of a player's mask is set if they hold (i, j)
+# on a board of n columns, so 3 * i + j for the 3x3 board
+FULL = (1 << 9) - 1
+
+LINES = [
+    [(i, 0), (i, 1), (i, 2)] for i in range(3)
+] + [
+    [(0, j), (1, j), (2, j)] for j in range(3)
+] + [
+    [(0, 0), (1, 1), (2, 2)], [(0, 2), (1, 1), (2, 0)]
+]
+WIN_MASKS = [sum(1 << (3 * i + j) for i, j in line) for line in LINES]
+
+# Whether each mask holds a whole line
+WINNING = [
+    any(mask & line == line for line in WIN_MASKS) for mask in range(1 << 9)
+]
+
+# Each mask under each of the 8 rotations and reflections of the board
+SYMMETRIES = []
+for transform in (
+    lambda i, j: (i, j), lambda i, j: (j, 2 - i),
+    lambda i, j: (2 - i, 2 - j), lambda i, j: (2 - j, i),
+    lambda i, j: (i, 2 - j), lambda i, j: (2 - i, j),
+    lambda i, j: (j, i), lambda i, j: (2 - j, 2 - i),
+):
+    bits = [3 * i + j for i, j in (transform(k // 3, k % 3) for k in range(9))]
+    SYMMETRIES.append([
+        sum(1 << bits[k] for k in range(9) if mask >> k & 1)
+        for mask in range(1 << 9)
+    ])
+
+# Minimax value of each position seen, by canonical position
+transpositions = {}
+
+
+def initial_state(m=3, n=3):
+    """
+    Returns starting state of the board, of m rows and n columns.
+    """
+    return [[EMPTY] * n for _ in range(m)]
+
 
-def initial_state():
+def default_k(board):
     """
-    Returns starting state of the board.
+    Returns how many in a row win on the board by default: its shorter
+    side, up to MAX_K.
     """
-    return [[EMPTY, EMPTY, EMPTY], [EMPTY, EMPTY, EMPTY], [EMPTY, EMPTY, EMPTY]]
+    return min(len(board), len(board[0]), MAX_K)
+
+
+@functools.lru_cache(maxsize=None)
+def game(m, n, k):
+    """
+    Returns the mnk.Game for boards of m rows and n columns where k in
+    a row win.
+    """
+    return mnk.Game(m, n, k)
 
 
 def player(board):
@@ -36,8 +97,8 @@ def actions(board):
     # Psuedo - return all rows (i) and colums (j) that are EMPTY (don't contain X or O)
     return {
         (i, j)
-        for i in range(3)
-        for j in range(3)
+        for i in range(len(board))
+        for j in range(len(board[i]))
         if board[i][j] == EMPTY  # does not contain X or O
     }
 
@@ -48,7 +109,9 @@ def result(board, action):
     """
     i, j = action  # action will be (row, column)
 
-    if not (0 <= i and 0 <= j < 3) or board[i][j] is not EMPTY:
+    if not (0 <= i < len(board) and 0 <= j < len(board[i])) or (
+        board[i][j] is not EMPTY
+    ):
         raise Exception("Invalid move")
 
     next_board = [row.copy() for row in board]  # copy the current board
@@ -56,44 +119,28 @@ def result(board, action):
     return next_board
 
 
-def winner(board):
+def winner(board, k=None):
     """
-    Returns the winner of the game, if there is one.
+    Returns the winner of the game, if there is one: whoever has k in a
+    row (by default, see default_k).
     """
-    # ROW, requires same character in location 0, 1 and 2 of same row, or
-    # COLUMN, you would have same character at location 0,1, or 2 on each row, or
-    # DIAGNAL, like row 1:0, row2:1, and row 3:3 to win.
-
-    # ROW, requires same character in location 0, 1 and 2 of same row.
-    for row in board:
-        if row[0] == row[1] == row[2] and row[0] is not EMPTY:
-            return row[0]
-
-    # COLUMN, you would have same character at location 0,1, or 2 on each row.
-    for col in range(3):
-        if (
-            board[0][col] == board[1][col] == board[2][col]
-            and board[0][col] is not EMPTY
-        ):
-            return board[0][col]
-
-    # DIAGNAL, like row 1:0, row2:1, and row 3:3 to win.
-    if board[0][0] == board[1][1] == board[2][2] and board[0][0] is not EMPTY:
-        return board[0][0]
-
-    elif board[0][2] == board[1][1] == board[2][0] and board[0][2] is not EMPTY:
-        return board[0][2]
-
+    # ROW, COLUMN or DIAGNAL: a window of k cells along any of them
+    rules = game(len(board), len(board[0]), k or default_k(board))
+    x, o = bitboards(board)
+    if rules.won(x):
+        return X
+    elif rules.won(o):
+        return O
     else:
         return None  # No Winner
 
 
-def terminal(board):
+def terminal(board, k=None):
     """
     Returns True if game is over, False otherwise.
     """
     # Check for Winnter: Winner is established as X or O (not None), return True (terminal)
-    if winner(board) is not None:
+    if winner(board, k) is not None:
         return True
 
     # Empty board function.  If there is an empty row, then False (not terminal), else True
@@ -103,13 +150,14 @@ def terminal(board):
     return True
 
 
-def utility(board):
+def utility(board, k=None):
     """
     Returns 1 if X has won the game, -1 if O has won, 0 otherwise.
     """
-    if winner(board) == X:
+    won = winner(board, k)
+    if won == X:
         return 1
-    elif winner(board) == O:
+    elif won == O:
         return -1
     else:
         return 0
@@ -118,57 +166,120 @@ def utility(board):
 def minimax(board):
     """
     Returns the optimal action for the current player on the board.
+    Only plays 3x3 boards, where the whole game can be searched; see
+    alphabeta for larger ones.
     """
+    if len(board) != 3 or any(len(row) != 3 for row in board):
+        raise ValueError("minimax only plays 3x3 boards")
+
     # Game Over?
     if terminal(board):
         return None
 
-    # Determine if AI is X or O (Maximizer or Minimizer)
+    # Score every action by the value of the board it leads to, keeping
+    # the first one with the best score
     turn = player(board)
-
-    # If AI is X and Maximizing look for open spaces adjacent to X,
-    # then look to see if you could form a line or diagnal (i, j) from action
-    def maximizer(state):
-        if terminal(state):
-            return utility(state)
-
-        value = -2
-
-        for action in actions(state):
-            value = max(value, minimizer(result(state, action)))
-        return value
-
-    # If AI is O and Minimizin consider cost of other player.
-    def minimizer(state):
-        if terminal(state):
-            return utility(state)
-
-        value = 2
-
-        for action in actions(state):
-            value = min(value, maximizer(result(state, action)))
-        return value
-
-    # Determine the optimal move for optimal score
+    x, o = bitboards(board)
     optimal_move = None
-
-    # If X, optimal score is -2 (-1, 0, 1 logic) maximizer
-    if turn == X:
-        optimal_score = -2
-        for action in actions(board):
-            score = minimizer(result(board, action))
+    optimal_score = -2 if turn == X else 2
+    for action in actions(board):
+        move = 1 << (3 * action[0] + action[1])
+        if turn == X:
+            score = value(x | move, o)
             if score > optimal_score:
                 optimal_score = score
                 optimal_move = action
-
-    # If O, optimal socre is 2 (-1, 0, 1 logic) for minimizer
-    else:
-        optimal_score = 2
-        for action in actions(board):
-            score = maximizer(result(board, action))
+        else:
+            score = value(x, o | move)
             if score < optimal_score:
                 optimal_score = score
                 optimal_move = action
 
     # Return the optimal move
     return optimal_move
+
+
+def alphabeta(board, k=None, budget=BUDGET, depth=None):
+    """
+    Returns the best action found for the current player on the board,
+    where k in a row win, by alpha-beta search for up to budget seconds
+    (or up to depth plies, if given); see mnk.py.
+    """
+    found = search(board, k, budget, depth)
+    return None if found is None else found.move
+
+
+def search(board, k=None, budget=BUDGET, depth=None):
+    """
+    Returns the mnk.Result of alphabeta, with its move as (i, j), or None
+    if the game is over.
+    """
+    if terminal(board, k):
+        return None
+    n = len(board[0])
+    x, o = bitboards(board)
+    me, them = (x, o) if player(board) == X else (o, x)
+    found = game(len(board), n, k or default_k(board)).search(
+        me, them, budget, depth
+    )
+    return found._replace(move=divmod(found.move, n))
+
+
+def bitboards(board):
+    """
+    Returns (x, o), the masks of the cells X and O hold on the board.
+    """
+    x = o = 0
+    for i, row in enumerate(board):
+        for j, cell in enumerate(row):
+            if cell == X:
+                x |= 1 << (len(row) * i + j)
+            elif cell == O:
+                o |= 1 << (len(row) * i + j)
+    return x, o
+
+
+def canonical(x, o):
+    """
+    Returns a key for a position that is the same for all of its
+    rotations and reflections, as they have the same value.
+    """
+    return min(symmetry[x] << 9 | symmetry[o] for symmetry in SYMMETRIES)
+
+
+def value(x, o):
+    """
+    Returns the minimax value of the position with X on x and O on o:
+    1 if X wins with best play, -1 if O does, 0 otherwise.
+    """
+    key = canonical(x, o)
+    if key in transpositions:
+        return transpositions[key]
+
+    if WINNING[x]:
+        score = 1
+    elif WINNING[o]:
+        score = -1
+    elif x | o == FULL:
+        score = 0
+    else:
+        empty = FULL & ~(x | o)
+        cells = [1 << k for k in range(9) if empty >> k & 1]
+
+        # X moves first, so it is X's turn when both hold as many cells;
+        # a player stops looking once it finds a winning move
+        if x.bit_count() == o.bit_count():
+            score = -1
+            for move in cells:
+                score = max(score, value(x | move, o))
+                if score == 1:
+                    break
+        else:
+            score = 1
+            for move in cells:
+                score = min(score, value(x, o | move))
+                if score == -1:
+                    break
+
+    transpositions[key] = score
+    return score